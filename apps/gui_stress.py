@@ -0,0 +1,60 @@
+"""
+Stress test of PSK31QWidget with thousands of signals.
+
+Fake signals gain text at random and the time taken for the widget to
+take a snapshot of them and repaint is measured for each frame.  Only a
+fraction of the signals start active and there are more signals than
+rows so the model is pruning inactive signals throughout.
+"""
+
+import random
+import sys
+import time
+
+from PyQt4 import QtGui
+
+from ham.gui import PSK31QWidget
+
+class FakeSignal(object):
+
+    def __init__(self, freq):
+        self.carrier_freq = freq
+        self.active = True
+        self.message = ''
+
+    def get_message(self):
+        return self.message
+
+def main(n_signals=5000, n_frames=200, changing=0.05, sort_key='freq',
+         max_rows=1000, active=0.1):
+    rand = random.Random(0)
+    app = QtGui.QApplication(sys.argv)
+    widget = PSK31QWidget(sort_key=sort_key, max_rows=max_rows,
+                          repaint_interval=0)
+    widget.resize(600, 800)
+    signals = [FakeSignal(rand.uniform(200, 3000))
+               for i in range(0, n_signals)]
+    for signal in signals:
+        signal.active = rand.random() < active
+    frame_times = []
+    for frame in range(0, n_frames):
+        for signal in rand.sample(signals, int(changing*n_signals)):
+            signal.message += rand.choice('abcdefghijklmnopqrstuvwxyz ')
+            if rand.random() < 0.01:
+                signal.active = not signal.active
+        start = time.time()
+        widget.update(signals)
+        widget.model.flush()
+        widget.view.viewport().repaint()
+        app.processEvents()
+        frame_times.append(time.time() - start)
+    frame_times.sort()
+    print("{0} signals, {1} rows, {2} frames: median {3:.2f} ms, "
+          "95th percentile {4:.2f} ms, max {5:.2f} ms".format(
+              n_signals, widget.model.rowCount(), n_frames,
+              1000*frame_times[len(frame_times)//2],
+              1000*frame_times[int(0.95*len(frame_times))],
+              1000*frame_times[-1]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare decoding a recording with the numpy offline decoder and with a
+flow graph of Linkers and psk31_receivers.
+
+Usage: offline_benchmark.py [wav file] [freq ...]
+"""
+
+import sys
+import time
+
+from gnuradio import gr
+
+from ham import offline
+from ham.system import System
+from ham.channelizer import Linker
+from ham.signal_psk31 import psk31_receiver, msgq_to_string
+
+def flow_graph_decode(filename, samp_rate, freqs):
+    tb = gr.top_block()
+    src = gr.wavfile_source(filename, False)
+    system = System(tb, src, samp_rate, throttle=False, src_is_float=True)
+    receivers = {}
+    for freq in freqs:
+        linker = Linker(freq - system.center_freq, 80, system.samp_rate)
+        receiver = psk31_receiver(linker.samp_rate)
+        system.connect(system.out, linker, receiver)
+        receivers[freq] = receiver
+    system.refresh()
+    tb.run()
+    return dict((freq, msgq_to_string(receiver.msgq_out))
+                for freq, receiver in receivers.items())
+
+def main(filename='example.WAV', freqs=(1000, 1500, 1730)):
+    samples, samp_rate = offline.read_wav(filename)
+    duration = 1.0*len(samples)/samp_rate
+    print("{0}: {1:.1f} s, {2} channels".format(filename, duration,
+                                                 len(freqs)))
+    for name, decode in (
+        ('offline', lambda: offline.decode_wav(filename, freqs)),
+        ('flow graph', lambda: flow_graph_decode(filename, samp_rate, freqs))):
+        start = time.time()
+        results = decode()
+        elapsed = time.time() - start
+        print("{0}: {1:.2f} s ({2:.1f} times real time)".format(
+            name, elapsed, duration/elapsed))
+        for freq in freqs:
+            print("    {0}: {1!r}".format(freq, results[freq][:60]))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        main(sys.argv[1], [float(f) for f in sys.argv[2:]])
+    elif len(sys.argv) > 1:
+        main(sys.argv[1])
+    else:
+        main()
@@ -0,0 +1,61 @@
+"""
+Compare the CPU used by psk31_receiver (a chain of blocks),
+psk31_fused_receiver (the single psk31_demod_cb block) and
+qpsk31_receiver (a chain ending in the Viterbi decoder).
+
+A psk31 test signal is fed to a number of receivers of each kind at the
+sample rate a Linker produces and the process CPU time is reported per
+signal.
+"""
+
+import time
+
+from gnuradio import gr
+
+from ham.psk31_encode import varicode_bits, bpsk31_samples, qpsk31_samples
+from ham.signal_psk31 import (psk31_receiver, psk31_fused_receiver,
+                              qpsk31_receiver, msgq_to_string)
+
+def run(receiver_class, samples, samp_rate, n_signals):
+    """
+    Feed `samples` to `n_signals` receivers and return the CPU time
+    taken and the text decoded by the first receiver.
+    """
+    tb = gr.top_block()
+    src = gr.vector_source_c(samples, False)
+    receivers = [receiver_class(samp_rate) for i in range(0, n_signals)]
+    for receiver in receivers:
+        tb.connect(src, receiver)
+    start = time.clock()
+    tb.run()
+    cpu = time.clock() - start
+    return cpu, msgq_to_string(receivers[0].msgq_out)
+
+def main(n_signals=20, repeats=20):
+    # The sample rate coming out of a Linker on a 44100 Hz source.
+    samp_rate = 44100.0/int(44100/80/4)
+    samples_per_symbol = int(round(samp_rate/31.25))
+    text = "CQ CQ CQ de TEST TEST TEST the quick brown fox 0123456789 pse k\n"
+    bits = varicode_bits(text*repeats)
+    samples = bpsk31_samples(bits, samples_per_symbol, freq=0.001)
+    qpsk_samples = qpsk31_samples(bits, samples_per_symbol, freq=0.001)
+    duration = 1.0*len(samples)/samp_rate
+    print("{0} signals of {1:.1f} s each".format(n_signals, duration))
+    results = {}
+    for receiver_class, receiver_samples in (
+        (psk31_receiver, samples),
+        (psk31_fused_receiver, samples),
+        (qpsk31_receiver, qpsk_samples)):
+        cpu, message = run(receiver_class, receiver_samples, samp_rate,
+                           n_signals)
+        results[receiver_class] = message
+        print("{0}: {1:.4f} s CPU per signal ({2:.2f}% of real time)".format(
+            receiver_class.__name__, cpu/n_signals,
+            100.0*cpu/n_signals/duration))
+    if results[psk31_receiver] != results[psk31_fused_receiver]:
+        print("WARNING: decoded text differs between bpsk31 receivers.")
+    if text not in results[qpsk31_receiver]:
+        print("WARNING: qpsk31 receiver did not decode the text.")
+
+if __name__ == '__main__':
+    main()
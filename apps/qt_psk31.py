@@ -2,37 +2,76 @@ from PyQt4 import QtGui, QtCore
 
 from gnuradio import gr
 
-from ham.gui import PSK31QWidget
+from ham.gui import PSK31QWidget, WaterfallWidget
 from ham.system import System
 from ham.detector import Detector
 from ham.channelizer import Channelizer
+from ham.publisher import Publisher
+from ham.store import TrafficStore
 
 class App():
-    def __init__(self):
+    def __init__(self, publish_address=None, store_filename=None):
         tb = gr.top_block()
         src = gr.wavfile_source('example.WAV', True)
         samp_rate = 44100
         self.system = System(tb, src, samp_rate, throttle=True, src_is_float=True,
-                        center_freq=0)
+                        center_freq=0, analytic=True)
         self.detector = Detector(self.system)
         self.channelizer = Channelizer(self.system)
         self.app = QtGui.QApplication([])
+        self.window = QtGui.QWidget()
+        # The waterfall has its own fft updated often enough for a
+        # smooth display so the detection fft is left at its usual rate.
+        self.waterfall_tap = self.detector.add_tap(8)
+        self.waterfall = WaterfallWidget(self.waterfall_tap.get_fft_array,
+                                         self.detector.fftwidth)
+        self.waterfall.set_band(self.system.center_freq, self.system.samp_rate)
         self.widget = PSK31QWidget()
+        layout = QtGui.QVBoxLayout()
+        layout.addWidget(self.waterfall)
+        layout.addWidget(self.widget)
+        self.window.setLayout(layout)
+        self.window.show()
         self.timer = QtCore.QTimer()
         self.timer.timeout.connect(self.update)
         self.signals = []
+        if publish_address is not None:
+            self.publisher = Publisher(publish_address)
+        else:
+            self.publisher = None
+        if store_filename is not None:
+            self.store = TrafficStore(store_filename)
+        else:
+            self.store = None
         
     def run(self):
+        if self.publisher is not None:
+            self.publisher.start()
+        if self.store is not None:
+            self.store.start()
         self.system.start()
         self.update()
         self.timer.start(1000)
-        self.app.exec_()
+        self.waterfall.start()
+        try:
+            self.app.exec_()
+        finally:
+            self.timer.stop()
+            if self.store is not None:
+                self.store.stop()
+            if self.publisher is not None:
+                self.publisher.stop()
 
     def update(self):
         self.signals = self.detector.scan(self.signals)
         self.channelizer.update_signals(self.signals)
         self.system.refresh()
         self.widget.update(self.signals)
+        self.waterfall.set_signals(self.signals)
+        if self.publisher is not None:
+            self.publisher.update(self.signals, self.detector)
+        if self.store is not None:
+            self.store.update(self.signals)
 
 if __name__ == '__main__':
     app = App()
@@ -0,0 +1,50 @@
+"""
+Compare receiving a real (float) source as the imaginary half of a
+complex stream with converting it to an analytic signal at half the rate.
+
+For each mode the example WAV is received for a number of seconds in
+the same way as qt_psk31.py and the number of peaks, the number of
+signals found and the process CPU time are reported.
+"""
+
+import time
+
+from gnuradio import gr
+
+from ham.system import System
+from ham.detector import Detector
+from ham.channelizer import Channelizer
+
+def run(analytic, duration):
+    tb = gr.top_block()
+    src = gr.wavfile_source('example.WAV', True)
+    samp_rate = 44100
+    system = System(tb, src, samp_rate, throttle=True, src_is_float=True,
+                    center_freq=0, analytic=analytic)
+    detector = Detector(system)
+    channelizer = Channelizer(system)
+    signals = []
+    peak_counts = []
+    start = time.clock()
+    system.start()
+    for i in range(0, duration):
+        time.sleep(1)
+        peak_counts.append(len(detector.get_peaks()))
+        signals = detector.scan(signals)
+        channelizer.update_signals(signals)
+        system.refresh()
+    system.stop()
+    cpu = time.clock() - start
+    return cpu, peak_counts, signals
+
+def main(duration=10):
+    for analytic in (False, True):
+        cpu, peak_counts, signals = run(analytic, duration)
+        print("analytic={0}: {1:.2f} s CPU in {2} s, peaks per scan {3}, "
+              "{4} signals".format(analytic, cpu, duration, peak_counts,
+                                   len(signals)))
+        for signal in signals:
+            print("    {0:.1f} Hz".format(signal.carrier_freq))
+
+if __name__ == '__main__':
+    main()
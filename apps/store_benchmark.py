@@ -0,0 +1,95 @@
+"""
+Measure the write throughput and query latency of TrafficStore.
+
+Synthetic traffic from a number of signals is written as it would be by
+a receiver running in real time: each signal decodes a few characters
+per second and each simulated second of text is written as one batch,
+as the writer thread does with a flush interval of one second.  A set of
+queries is then timed, including substring searches for text that spans
+several seconds of decoding.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from ham.store import TrafficStore
+
+WORDS = ('CQ', 'DE', 'PSE', 'K', 'TNX', 'FER', 'QSO', 'RST', '599', 'NAME',
+         'QTH', 'RIG', 'ANT', '73', 'GL', 'HW', 'CPY', 'BTU', 'ES', 'UR')
+
+def random_callsign(rand):
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return (''.join(rand.choice(letters) for i in range(0, 2)) +
+            str(rand.randint(0, 9)) +
+            ''.join(rand.choice(letters) for i in range(0, 3)))
+
+def random_text(rand, callsigns, n_chars):
+    words = []
+    length = 0
+    while length < n_chars:
+        if rand.random() < 0.2:
+            word = 'DE ' + rand.choice(callsigns)
+        else:
+            word = rand.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words) + ' '
+
+def main(filename, n_chars=10000000, n_signals=50, chars_per_second=(3, 5)):
+    rand = random.Random(0)
+    callsigns = [random_callsign(rand) for i in range(0, 1000)]
+    freqs = [rand.uniform(200, 3000) for i in range(0, n_signals)]
+    store = TrafficStore(filename)
+    texts = [random_text(rand, callsigns, n_chars//n_signals)
+             for freq in freqs]
+    positions = [0]*n_signals
+    timestamp = 0.0
+    start = time.time()
+    written = 0
+    while written < n_chars:
+        batch = []
+        for i, freq in enumerate(freqs):
+            n = rand.randint(*chars_per_second)
+            text = texts[i][positions[i]:positions[i]+n]
+            if text:
+                batch.append((timestamp, freq, '', text))
+                positions[i] += n
+                written += len(text)
+        if not batch:
+            break
+        store.write_batch(batch)
+        timestamp += 1.0
+    elapsed = time.time() - start
+    print("Wrote {0} chars in {1} rows in {2:.1f} s ({3:.0f} chars/s, "
+          "{4:.0f} s of traffic)".format(
+              store.written_chars, store.written_rows, elapsed,
+              store.written_chars/elapsed, timestamp))
+    phrase = 'DE ' + callsigns[0]
+    expected = sum(text.count(phrase) for text in texts)
+    queries = (
+        ('time range', lambda: store.time_range(timestamp/2,
+                                                timestamp/2 + 60)),
+        ('freq window', lambda: store.freq_window(1000, 1100, limit=1000)),
+        ('freq window and time', lambda: store.freq_window(
+            1000, 1100, timestamp/2, timestamp/2 + 600)),
+        ('substring in time range', lambda: store.search(
+            'TNX FER', timestamp/2, timestamp/2 + 600)),
+        ('substring', lambda: store.search(phrase)),
+        ('callsign', lambda: store.search_callsign(callsigns[0])),
+        )
+    for name, query in queries:
+        start = time.time()
+        rows = query()
+        print("{0}: {1} rows in {2:.2f} ms".format(
+            name, len(rows), 1000*(time.time() - start)))
+    print("'{0}' occurs {1} times in the traffic".format(phrase, expected))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(sys.argv[1])
+    else:
+        directory = tempfile.mkdtemp()
+        main(os.path.join(directory, 'traffic.db'))
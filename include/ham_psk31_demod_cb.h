@@ -0,0 +1,113 @@
+/* -*- c++ -*- */
+/* 
+ * Copyright 2012 Free Software Foundation.
+ * 
+ * This is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 3, or (at your option)
+ * any later version.
+ * 
+ * This software is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ * 
+ * You should have received a copy of the GNU General Public License
+ * along with this software; see the file COPYING.  If not, write to
+ * the Free Software Foundation, Inc., 51 Franklin Street,
+ * Boston, MA 02110-1301, USA.
+ */
+
+#ifndef INCLUDED_HAM_PSK31_DEMOD_CB_H
+#define INCLUDED_HAM_PSK31_DEMOD_CB_H
+
+#include <ham_api.h>
+#include <gr_block.h>
+#include <gr_complex.h>
+#include <gri_mmse_fir_interpolator_cc.h>
+#include <vector>
+
+class ham_psk31_demod_cb;
+typedef boost::shared_ptr<ham_psk31_demod_cb> ham_psk31_demod_cb_sptr;
+
+HAM_API ham_psk31_demod_cb_sptr ham_make_psk31_demod_cb (
+	float omega, float costas_bw, float gain_omega, float mu, float gain_mu,
+	float omega_relative_limit, float receiver_bw, float fmin, float fmax,
+	bool bit_flip);
+
+/*!
+ * \brief Demodulates a baseband psk31 signal straight to text.
+ * \ingroup ham
+ *
+ * Does the work of costas_loop_cc, clock_recovery_mm_cc,
+ * constellation_receiver_cb (bpsk), diff_decoder_bb(2) and
+ * psk31_decode_bb in a single work loop so that a signal only pays
+ * for one block's worth of scheduler and buffer overhead.
+ *
+ * The parameters have the same meaning as those of the blocks it
+ * replaces:
+ *   omega - samples per symbol.
+ *   costas_bw - loop bandwidth of the costas loop.
+ *   gain_omega, mu, gain_mu, omega_relative_limit - clock recovery.
+ *   receiver_bw, fmin, fmax - loop of the constellation receiver.
+ *   bit_flip - as for psk31_decode_bb.
+ */
+class HAM_API ham_psk31_demod_cb : public gr_block
+{
+	friend HAM_API ham_psk31_demod_cb_sptr ham_make_psk31_demod_cb (
+		float omega, float costas_bw, float gain_omega, float mu, float gain_mu,
+		float omega_relative_limit, float receiver_bw, float fmin, float fmax,
+		bool bit_flip);
+
+	ham_psk31_demod_cb (
+		float omega, float costas_bw, float gain_omega, float mu, float gain_mu,
+		float omega_relative_limit, float receiver_bw, float fmin, float fmax,
+		bool bit_flip);
+
+ public:
+	~ham_psk31_demod_cb ();
+
+  void forecast (int noutput_items, gr_vector_int &ninput_items_required);
+
+  int general_work (int noutput_items,
+		    gr_vector_int &ninput_items,
+		    gr_vector_const_void_star &input_items,
+		    gr_vector_void_star &output_items);
+
+  float omega () const { return d_omega; }
+  void set_omega (float omega);
+
+ private:
+  // Runs one symbol through clock recovery and the later stages.
+  // Returns true and sets symbol if a character was completed.
+  bool symbol_step (unsigned char &symbol);
+  bool decode_bit (unsigned char bit, unsigned char &symbol);
+
+  // Costas loop.
+  float d_costas_alpha, d_costas_beta;
+  float d_costas_phase, d_costas_freq;
+
+  // Clock recovery.
+  gri_mmse_fir_interpolator_cc d_interp;
+  std::vector<gr_complex> d_buf;
+  unsigned int d_buf_index;
+  float d_omega, d_omega_mid, d_omega_lim, d_omega_relative_limit;
+  float d_gain_omega;
+  float d_mu, d_gain_mu;
+  gr_complex d_p_2T, d_p_1T, d_p_0T;
+  gr_complex d_c_2T, d_c_1T, d_c_0T;
+
+  // Constellation receiver.
+  float d_rx_alpha, d_rx_beta;
+  float d_rx_phase, d_rx_freq;
+  float d_rx_fmin, d_rx_fmax;
+
+  // Differential and varicode decoding.
+  unsigned char d_last_symbol;
+  unsigned char psk31_map[4096];
+  bool d_last_zero;
+  unsigned int d_current_bits;
+  bool d_bit_flip;
+};
+
+#endif /* INCLUDED_HAM_PSK31_DEMOD_CB_H */
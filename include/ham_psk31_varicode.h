@@ -0,0 +1,43 @@
+/* -*- c++ -*- */
+/* 
+ * Copyright 2012 Free Software Foundation.
+ * 
+ * This is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 3, or (at your option)
+ * any later version.
+ * 
+ * This software is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ * 
+ * You should have received a copy of the GNU General Public License
+ * along with this software; see the file COPYING.  If not, write to
+ * the Free Software Foundation, Inc., 51 Franklin Street,
+ * Boston, MA 02110-1301, USA.
+ */
+
+#ifndef INCLUDED_HAM_PSK31_VARICODE_H
+#define INCLUDED_HAM_PSK31_VARICODE_H
+
+#include <ham_api.h>
+
+/*!
+ * \brief Return the psk31 varicode for the ascii character c.
+ * \ingroup ham
+ *
+ * The code is returned with its most significant bit sent first and
+ * without the trailing '00' separator.  Characters above 127 have no
+ * code and return 0.
+ */
+HAM_API unsigned short ham_psk31_varicode (unsigned char c);
+
+/*!
+ * \brief Fill map (of length 4096) with the character for each varicode.
+ *
+ * Entries that are not a valid varicode are set to 255.
+ */
+HAM_API void ham_psk31_varicode_map (unsigned char *map);
+
+#endif /* INCLUDED_HAM_PSK31_VARICODE_H */
@@ -0,0 +1,81 @@
+/* -*- c++ -*- */
+/* 
+ * Copyright 2012 Free Software Foundation.
+ * 
+ * This is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 3, or (at your option)
+ * any later version.
+ * 
+ * This software is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ * 
+ * You should have received a copy of the GNU General Public License
+ * along with this software; see the file COPYING.  If not, write to
+ * the Free Software Foundation, Inc., 51 Franklin Street,
+ * Boston, MA 02110-1301, USA.
+ */
+
+#ifndef INCLUDED_HAM_QPSK31_VITERBI_CB_H
+#define INCLUDED_HAM_QPSK31_VITERBI_CB_H
+
+#include <ham_api.h>
+#include <gr_sync_block.h>
+#include <gr_complex.h>
+
+class ham_qpsk31_viterbi_cb;
+typedef boost::shared_ptr<ham_qpsk31_viterbi_cb> ham_qpsk31_viterbi_cb_sptr;
+
+HAM_API ham_qpsk31_viterbi_cb_sptr ham_make_qpsk31_viterbi_cb (bool reverse);
+
+/*!
+ * \brief Decodes qpsk31 symbols to the varicode bitstream.
+ * \ingroup ham
+ *
+ * Takes one complex sample per symbol (e.g. from clock_recovery_mm_cc),
+ * works out the phase change from the previous symbol and runs it
+ * through a Viterbi decoder for the rate 1/2, K=5 convolutional code
+ * with polynomials 0x19 and 0x17.  The code bits (0x19 bit first)
+ * select the phase change: 11 is 0, 01 is +90, 10 is -90 and 00 is 180
+ * degrees.  reverse swaps the +90 and -90 changes for the other
+ * sideband.
+ *
+ * The output is one bit per symbol and is delayed by DEPTH - 1 symbols
+ * (the oldest of the DEPTH bits kept for each surviving path).
+ * It can be passed straight to psk31_decode_bb with bit_flip false.
+ *
+ * The four branch metrics are calculated once per symbol and the
+ * add-compare-select for the 16 states looks them up through a table of
+ * the code output for each transition.  The surviving paths are kept
+ * by register exchange.
+ */
+class HAM_API ham_qpsk31_viterbi_cb : public gr_sync_block
+{
+	friend HAM_API ham_qpsk31_viterbi_cb_sptr ham_make_qpsk31_viterbi_cb (bool reverse);
+
+	ham_qpsk31_viterbi_cb (bool reverse);
+
+ public:
+	~ham_qpsk31_viterbi_cb ();
+
+  static const int NSTATES = 16;
+  static const int DEPTH = 20;
+
+  int work (int noutput_items,
+			gr_vector_const_void_star &input_items,
+			gr_vector_void_star &output_items);
+
+ private:
+  bool d_reverse;
+  gr_complex d_last;
+  // The ideal phase change for each pair of code bits.
+  gr_complex d_points[4];
+  // Code bits sent for each value of the 5 bit shift register.
+  unsigned char d_code[2*NSTATES];
+  float d_metrics[NSTATES];
+  unsigned int d_paths[NSTATES];
+};
+
+#endif /* INCLUDED_HAM_QPSK31_VITERBI_CB_H */
@@ -24,6 +24,7 @@
 
 #include <gr_io_signature.h>
 #include <ham_psk31_decode_bb.h>
+#include <ham_psk31_varicode.h>
 #include <iostream>
 
 ham_psk31_decode_bb_sptr
@@ -39,9 +40,7 @@ ham_psk31_decode_bb::ham_psk31_decode_bb (bool bit_flip)
 		gr_make_io_signature (1, 1, sizeof (unsigned char)))
 {
   // Make a lookup mapping for varicodes.
-  for (unsigned int i=0; i<128; i++) {
-	psk31_map[psk31_varicodes[i]] = i;
-  }
+  ham_psk31_varicode_map(psk31_map);
   d_bit_flip = bit_flip;
   d_last_zero = true;
   d_current_bits = 0;
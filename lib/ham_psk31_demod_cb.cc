@@ -0,0 +1,248 @@
+/* -*- c++ -*- */
+/* 
+ * Copyright 2012 Free Software Foundation
+ * 
+ * This is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 3, or (at your option)
+ * any later version.
+ * 
+ * This software is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ * 
+ * You should have received a copy of the GNU General Public License
+ * along with this software; see the file COPYING.  If not, write to
+ * the Free Software Foundation, Inc., 51 Franklin Street,
+ * Boston, MA 02110-1301, USA.
+ */
+
+#ifdef HAVE_CONFIG_H
+#include "config.h"
+#endif
+
+#include <gr_io_signature.h>
+#include <gr_expj.h>
+#include <gr_math.h>
+#include <ham_psk31_demod_cb.h>
+#include <ham_psk31_varicode.h>
+#include <algorithm>
+#include <cmath>
+
+static const float TWO_PI = 2.0 * M_PI;
+
+// Loop gains as calculated by gri_control_loop.
+static void
+loop_gains (float loop_bw, float &alpha, float &beta)
+{
+  float damping = sqrt (2.0) / 2.0;
+  float denom = 1.0 + 2.0*damping*loop_bw + loop_bw*loop_bw;
+  alpha = (4*damping*loop_bw) / denom;
+  beta = (4*loop_bw*loop_bw) / denom;
+}
+
+static inline float
+wrap_phase (float phase)
+{
+  while (phase > TWO_PI)
+	phase -= TWO_PI;
+  while (phase < -TWO_PI)
+	phase += TWO_PI;
+  return phase;
+}
+
+static inline float
+clamp (float x, float lo, float hi)
+{
+  if (x > hi)
+	return hi;
+  if (x < lo)
+	return lo;
+  return x;
+}
+
+static inline gr_complex
+slicer_0deg (gr_complex sample)
+{
+  return gr_complex (sample.real() > 0 ? 1 : -1, sample.imag() > 0 ? 1 : -1);
+}
+
+ham_psk31_demod_cb_sptr
+ham_make_psk31_demod_cb (float omega, float costas_bw, float gain_omega,
+						 float mu, float gain_mu, float omega_relative_limit,
+						 float receiver_bw, float fmin, float fmax,
+						 bool bit_flip)
+{
+	return ham_psk31_demod_cb_sptr (
+		new ham_psk31_demod_cb (omega, costas_bw, gain_omega, mu, gain_mu,
+								omega_relative_limit, receiver_bw, fmin, fmax,
+								bit_flip));
+}
+
+
+ham_psk31_demod_cb::ham_psk31_demod_cb (float omega, float costas_bw,
+										float gain_omega, float mu,
+										float gain_mu,
+										float omega_relative_limit,
+										float receiver_bw, float fmin,
+										float fmax, bool bit_flip)
+	: gr_block ("psk31_demod_cb",
+		gr_make_io_signature (1, 1, sizeof (gr_complex)),
+		gr_make_io_signature (1, 1, sizeof (unsigned char))),
+	  d_costas_phase (0), d_costas_freq (0),
+	  d_buf_index (0),
+	  d_omega_relative_limit (omega_relative_limit), d_gain_omega (gain_omega),
+	  d_mu (mu), d_gain_mu (gain_mu),
+	  d_p_2T (0), d_p_1T (0), d_p_0T (0),
+	  d_c_2T (0), d_c_1T (0), d_c_0T (0),
+	  d_rx_phase (0), d_rx_freq (0), d_rx_fmin (fmin), d_rx_fmax (fmax),
+	  d_last_symbol (0), d_last_zero (true), d_current_bits (0),
+	  d_bit_flip (bit_flip)
+{
+  loop_gains (costas_bw, d_costas_alpha, d_costas_beta);
+  loop_gains (receiver_bw, d_rx_alpha, d_rx_beta);
+  set_omega (omega);
+  // Make a lookup mapping for varicodes.
+  ham_psk31_varicode_map(psk31_map);
+}
+
+
+ham_psk31_demod_cb::~ham_psk31_demod_cb ()
+{
+}
+
+void
+ham_psk31_demod_cb::set_omega (float omega)
+{
+  d_omega = omega;
+  d_omega_mid = omega;
+  d_omega_lim = d_omega_mid * d_omega_relative_limit;
+}
+
+void
+ham_psk31_demod_cb::forecast (int noutput_items,
+							  gr_vector_int &ninput_items_required)
+{
+  // Every character is at least three symbols long.
+  ninput_items_required[0] = (int) ceil (3 * noutput_items * d_omega);
+}
+
+bool
+ham_psk31_demod_cb::decode_bit (unsigned char next_bit, unsigned char &symbol)
+{
+  // The same state machine as ham_psk31_decode_bb.
+  bool found = false;
+  if (d_bit_flip) {
+	next_bit = (next_bit + 1) % 2;
+  }
+  if (d_last_zero) {
+	if (!next_bit) {
+	  // We have '00' so output symbol.
+	  if (d_current_bits) {
+		if (d_current_bits >= 4096 || psk31_map[d_current_bits] >= 128) {
+		  symbol = '?';
+		} else {
+		  symbol = psk31_map[d_current_bits];
+		}
+		found = true;
+		d_current_bits = 0;
+	  }
+	} else {
+	  d_last_zero = false;
+	  // Add '01' to the end of the current_bits
+	  d_current_bits = d_current_bits << 2;
+	  d_current_bits += 1;
+	}
+  } else {
+	if (!next_bit) {
+	  d_last_zero = true;
+	} else {
+	  // Add '1' to the end of the current_bits
+	  d_current_bits = d_current_bits << 1;
+	  d_current_bits += 1;
+	}
+  }
+  return found;
+}
+
+bool
+ham_psk31_demod_cb::symbol_step (unsigned char &symbol)
+{
+  // Mueller and Muller clock recovery as in clock_recovery_mm_cc.
+  d_p_2T = d_p_1T;
+  d_p_1T = d_p_0T;
+  d_p_0T = d_interp.interpolate (&d_buf[d_buf_index], d_mu);
+
+  d_c_2T = d_c_1T;
+  d_c_1T = d_c_0T;
+  d_c_0T = slicer_0deg (d_p_0T);
+
+  gr_complex x = (d_c_0T - d_c_2T) * conj (d_p_1T);
+  gr_complex y = (d_p_0T - d_p_2T) * conj (d_c_1T);
+  float mm_val = gr_branchless_clip ((y - x).real(), 1.0);
+  d_omega = d_omega + d_gain_omega * mm_val;
+  d_omega = d_omega_mid + gr_branchless_clip (d_omega - d_omega_mid,
+											  d_omega_lim);
+  d_mu = d_mu + d_omega + d_gain_mu * mm_val;
+  d_buf_index += (int) floor (d_mu);
+  d_mu -= floor (d_mu);
+
+  // BPSK decision and phase tracking as in constellation_receiver_cb.
+  gr_complex sample = d_p_0T * gr_expj (d_rx_phase);
+  unsigned char bit = sample.real() > 0;
+  float phase_error = -arg (sample * gr_complex (bit ? 1 : -1, 0));
+  d_rx_freq = d_rx_freq + d_rx_beta * phase_error;
+  d_rx_phase = wrap_phase (d_rx_phase + d_rx_freq + d_rx_alpha * phase_error);
+  d_rx_freq = clamp (d_rx_freq, d_rx_fmin, d_rx_fmax);
+
+  // Differential decoding as in diff_decoder_bb(2).
+  unsigned char diff = (bit + 2 - d_last_symbol) % 2;
+  d_last_symbol = bit;
+
+  return decode_bit (diff, symbol);
+}
+
+int
+ham_psk31_demod_cb::general_work (int noutput_items,
+			       gr_vector_int &ninput_items,
+			       gr_vector_const_void_star &input_items,
+			       gr_vector_void_star &output_items)
+{
+  const gr_complex *in = (const gr_complex *) input_items[0];
+  unsigned char *out = (unsigned char *) output_items[0];
+  unsigned int ntaps = d_interp.ntaps ();
+  int i = 0;
+  int j = 0;
+  unsigned char symbol;
+
+  while (i < noutput_items) {
+	// Run clock recovery over whatever carrier corrected samples we have.
+	while ((i < noutput_items) && (d_buf_index + ntaps <= d_buf.size ())) {
+	  if (symbol_step (symbol)) {
+		out[i++] = symbol;
+	  }
+	}
+	if (i >= noutput_items || j >= ninput_items[0]) {
+	  break;
+	}
+	// Costas loop (order 4) as in costas_loop_cc.
+	gr_complex sample = in[j++] * gr_expj (-d_costas_phase);
+	float error = ((sample.real() > 0 ? 1.0 : -1.0) * sample.imag()
+				   - (sample.imag() > 0 ? 1.0 : -1.0) * sample.real());
+	error = gr_branchless_clip (error, 1.0);
+	d_costas_freq = d_costas_freq + d_costas_beta * error;
+	d_costas_phase = wrap_phase (d_costas_phase + d_costas_freq
+								 + d_costas_alpha * error);
+	d_costas_freq = clamp (d_costas_freq, -1.0, 1.0);
+	d_buf.push_back (sample);
+  }
+
+  // Drop the samples that clock recovery has moved past.
+  unsigned int used = std::min (d_buf_index, (unsigned int) d_buf.size ());
+  d_buf.erase (d_buf.begin (), d_buf.begin () + used);
+  d_buf_index -= used;
+
+  consume_each (j);
+  return i;
+}
@@ -0,0 +1,132 @@
+/* -*- c++ -*- */
+/* 
+ * Copyright 2012 Free Software Foundation
+ * 
+ * This is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 3, or (at your option)
+ * any later version.
+ * 
+ * This software is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ * 
+ * You should have received a copy of the GNU General Public License
+ * along with this software; see the file COPYING.  If not, write to
+ * the Free Software Foundation, Inc., 51 Franklin Street,
+ * Boston, MA 02110-1301, USA.
+ */
+
+#ifdef HAVE_CONFIG_H
+#include "config.h"
+#endif
+
+#include <gr_io_signature.h>
+#include <ham_qpsk31_viterbi_cb.h>
+#include <cmath>
+
+static const unsigned int POLY1 = 0x19;
+static const unsigned int POLY2 = 0x17;
+
+static unsigned int
+parity (unsigned int x)
+{
+  unsigned int p = 0;
+  while (x) {
+	p ^= x & 1;
+	x >>= 1;
+  }
+  return p;
+}
+
+ham_qpsk31_viterbi_cb_sptr
+ham_make_qpsk31_viterbi_cb (bool reverse)
+{
+	return ham_qpsk31_viterbi_cb_sptr (new ham_qpsk31_viterbi_cb (reverse));
+}
+
+
+ham_qpsk31_viterbi_cb::ham_qpsk31_viterbi_cb (bool reverse)
+	: gr_sync_block ("qpsk31_viterbi_cb",
+		gr_make_io_signature (1, 1, sizeof (gr_complex)),
+		gr_make_io_signature (1, 1, sizeof (unsigned char))),
+	  d_reverse (reverse), d_last (1, 0)
+{
+  d_points[0] = gr_complex (-1, 0);
+  d_points[1] = gr_complex (0, 1);
+  d_points[2] = gr_complex (0, -1);
+  d_points[3] = gr_complex (1, 0);
+  for (unsigned int sr=0; sr<2*NSTATES; sr++) {
+	d_code[sr] = (parity (sr & POLY1) << 1) | parity (sr & POLY2);
+  }
+  for (int s=0; s<NSTATES; s++) {
+	d_metrics[s] = 0;
+	d_paths[s] = 0;
+  }
+}
+
+
+ham_qpsk31_viterbi_cb::~ham_qpsk31_viterbi_cb ()
+{
+}
+
+
+int
+ham_qpsk31_viterbi_cb::work (int noutput_items,
+							 gr_vector_const_void_star &input_items,
+							 gr_vector_void_star &output_items)
+{
+  const gr_complex *in = (const gr_complex *) input_items[0];
+  unsigned char *out = (unsigned char *) output_items[0];
+  float branch[4];
+  float metrics[NSTATES];
+  unsigned int paths[NSTATES];
+
+  for (int i=0; i<noutput_items; i++) {
+	gr_complex diff = in[i] * conj (d_last);
+	d_last = in[i];
+	float mag = abs (diff);
+	if (mag > 0) {
+	  diff /= mag;
+	}
+	if (d_reverse) {
+	  diff = conj (diff);
+	}
+	// Branch metric for each pair of code bits.
+	for (int c=0; c<4; c++) {
+	  branch[c] = 1 - (diff.real() * d_points[c].real()
+					   + diff.imag() * d_points[c].imag());
+	}
+	// Add-compare-select.  State n is reached by shifting bit n&1 into
+	// state n>>1 or (n>>1)|8.
+	float best_metric = 0;
+	int best_state = 0;
+	for (int n=0; n<NSTATES; n++) {
+	  unsigned int bit = n & 1;
+	  unsigned int p0 = n >> 1;
+	  unsigned int p1 = p0 | (NSTATES >> 1);
+	  float m0 = d_metrics[p0] + branch[d_code[(p0 << 1) | bit]];
+	  float m1 = d_metrics[p1] + branch[d_code[(p1 << 1) | bit]];
+	  if (m0 <= m1) {
+		metrics[n] = m0;
+		paths[n] = (d_paths[p0] << 1) | bit;
+	  } else {
+		metrics[n] = m1;
+		paths[n] = (d_paths[p1] << 1) | bit;
+	  }
+	  if (n == 0 || metrics[n] < best_metric) {
+		best_metric = metrics[n];
+		best_state = n;
+	  }
+	}
+	// Keep the metrics small.
+	for (int n=0; n<NSTATES; n++) {
+	  d_metrics[n] = metrics[n] - best_metric;
+	  d_paths[n] = paths[n];
+	}
+	out[i] = (d_paths[best_state] >> (DEPTH - 1)) & 1;
+  }
+
+  return noutput_items;
+}
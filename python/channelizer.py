@@ -22,7 +22,8 @@ class Channelizer(object):
                 if signal in self.linkers:
                     linker = self.linkers[signal]
                 else:
-                    linker = Linker(signal.carrier_freq, signal.bandwidth, self.system.samp_rate)
+                    linker = Linker(signal.carrier_freq - self.system.center_freq,
+                                    signal.bandwidth, self.system.samp_rate)
                     self.linkers[signal] = linker
                     signal.set_sample_rate(linker.samp_rate)
                 logger.debug("New freq at {0}".format(signal.carrier_freq))
@@ -4,6 +4,8 @@ Defines Detector objects that take care of signal detection and classification.
 
 import logging
 
+import numpy
+
 from gnuradio import gr, window
 
 from ham.signal_psk31 import PSK31Signal
@@ -28,6 +30,31 @@ def convolve(data, taps):
         new_data.append(value)
     return new_data
 
+class FFTTap(object):
+    """
+    An fft of vectors from `source` updated every 1 in n vectors.
+
+    Args:
+        system: A wrapper for the top block.
+        source: Block producing vectors of fftwidth complex samples.
+        fftwidth: The width of the fft.
+        n: The fft is only updated every 1 in n times.
+    """
+
+    def __init__(self, system, source, fftwidth, n):
+        self.fftwidth = fftwidth
+        self.keep_one_in_n = gr.keep_one_in_n(gr.sizeof_gr_complex*fftwidth, n)
+        self.fft = gr.fft_vcc(fftwidth, True, window.blackmanharris(fftwidth))
+        self.probe = gr.probe_signal_vc(fftwidth)
+        system.connect(source, self.keep_one_in_n, self.fft, self.probe)
+
+    def get_fft_array(self):
+        """
+        Return the fft as a numpy array of magnitudes.
+        """
+        data = numpy.array(self.probe.level(), dtype=numpy.complex64)
+        return data.real*data.real + data.imag*data.imag
+
 class Detector(object):
     
     def __init__(self, system, fftwidth=256, n=128, cutoff=100):
@@ -52,6 +79,14 @@ class Detector(object):
         system.connect(system.out, self.stream_to_vector, self.keep_one_in_n,
                        self.fft, self.probe)
 
+    def add_tap(self, n):
+        """
+        Add another fft of the detection stream updated every 1 in `n`
+        times, e.g. for a display that needs updating more often than
+        the detection fft.  Returns an FFTTap.
+        """
+        return FFTTap(self.system, self.stream_to_vector, self.fftwidth, n)
+
     def get_fft(self):
         """
         Return the fft.
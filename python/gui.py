@@ -1,52 +1,446 @@
+"""
+Qt widgets for displaying the received signals.
+
+The signals are shown in a QListView backed by SignalListModel so that
+only the visible rows are painted.  The model keeps a snapshot of each
+signal's text and only marks a row as changed when that text grows.
+Changes are collected and passed on to the view at most once per
+repaint interval.
+
+WaterfallWidget shows the spectrum that the Detector calculates.
+"""
+
 import logging
+import time
 
-from PyQt4 import QtGui
+import numpy
+from PyQt4 import QtGui, QtCore
 
-class SignalWidget(QtGui.QFrame):
+logger = logging.getLogger(__name__)
 
-    def __init__(self, freq, initial_text):
-        super(SignalWidget, self).__init__()
-        self.setFrameStyle(QtGui.QFrame.Box)
-        self.initUI(freq, initial_text)
+# Role for getting the signal's frequency from the model.
+FreqRole = QtCore.Qt.UserRole
+# Role for getting the signal's text from the model.
+TextRole = QtCore.Qt.UserRole + 1
 
-    def initUI(self, freq, initial_text):
-        self.vbox = QtGui.QVBoxLayout()
-        self.freq_label = QtGui.QLabel(str(freq), self)
-        self.text_label = QtGui.QLabel(initial_text, self)
-        self.setLayout(self.vbox)
-        self.vbox.addWidget(self.freq_label) 
-        self.vbox.addWidget(self.text_label) 
+SORT_KEYS = ('freq', 'activity')
+
+
+class SignalRow(object):
+    """
+    What the model knows about one signal.
+    """
+
+    def __init__(self, signal):
+        self.signal = signal
+        self.freq = signal.carrier_freq
+        self.text = ''
+        self.last_change = time.time()
+        self.active = signal.active
+
+
+class SignalListModel(QtCore.QAbstractListModel):
+    """
+    A list model with one row per signal.
+
+    Args:
+        sort_key: 'freq' to order rows by frequency or 'activity' to
+            put the most recently changed signals first.
+        max_rows: When there are more rows than this the inactive signals
+            that changed longest ago are removed.
+        repaint_interval: Minimum time in ms between notifying views of
+            changes.
+    """
+
+    def __init__(self, sort_key='freq', max_rows=1000, repaint_interval=200,
+                 parent=None):
+        super(SignalListModel, self).__init__(parent)
+        if sort_key not in SORT_KEYS:
+            raise ValueError("Unrecognised sort key {0}.".format(sort_key))
+        self.sort_key = sort_key
+        self.max_rows = max_rows
+        self.rows = []
+        self.row_of_signal = {}
+        # Signals that were removed mapped to whether they were active
+        # when removed.  They are not shown again until they become
+        # active after having been inactive.
+        self.removed = {}
+        self.dirty = set([])
+        self.needs_sort = False
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(repaint_interval)
+        self.timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        row = self.rows[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return "{0:.1f}: {1}".format(row.freq, row.text)
+        elif role == FreqRole:
+            return row.freq
+        elif role == TextRole:
+            return row.text
+        elif role == QtCore.Qt.ForegroundRole:
+            if not row.active:
+                return QtGui.QBrush(QtCore.Qt.gray)
+        return None
+
+    def set_sort_key(self, sort_key):
+        if sort_key not in SORT_KEYS:
+            raise ValueError("Unrecognised sort key {0}.".format(sort_key))
+        self.sort_key = sort_key
+        self.needs_sort = True
+        self.schedule()
+
+    def add_signal(self, signal):
+        row = SignalRow(signal)
+        position = len(self.rows)
+        self.beginInsertRows(QtCore.QModelIndex(), position, position)
+        self.rows.append(row)
+        self.row_of_signal[signal] = row
+        self.endInsertRows()
+        self.needs_sort = True
+        return row
+
+    def remove_signal(self, signal):
+        row = self.row_of_signal.get(signal, None)
+        if row is None:
+            return
+        self.remove_rows([row])
+
+    def remove_rows(self, rows):
+        """
+        Remove `rows` and remember their signals so that update() doesn't
+        add them straight back.
+        """
+        removing = set(rows)
+        positions = [i for i, row in enumerate(self.rows) if row in removing]
+        # Remove each run of consecutive rows starting from the end so
+        # that the earlier positions stay valid.
+        while positions:
+            last = positions.pop()
+            first = last
+            while positions and positions[-1] == first - 1:
+                first = positions.pop()
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            del self.rows[first:last+1]
+            self.endRemoveRows()
+        for row in removing:
+            del self.row_of_signal[row.signal]
+            self.removed[row.signal] = row.signal.active
+            self.dirty.discard(row)
+
+    def update(self, signals):
+        """
+        Take a new snapshot of `signals`.
+
+        Rows are only marked as changed if a signal's text or activity
+        changed.
+        """
+        now = time.time()
+        for signal in signals:
+            row = self.row_of_signal.get(signal, None)
+            if row is None:
+                if signal in self.removed:
+                    if not signal.active:
+                        self.removed[signal] = False
+                        continue
+                    if self.removed[signal]:
+                        continue
+                    del self.removed[signal]
+                row = self.add_signal(signal)
+            text = signal.get_message()
+            if len(text) != len(row.text) or signal.active != row.active:
+                row.text = text.replace('\n', ' ')
+                row.active = signal.active
+                row.last_change = now
+                self.dirty.add(row)
+                if self.sort_key == 'activity':
+                    self.needs_sort = True
+        self.prune()
+        if self.dirty or self.needs_sort:
+            self.schedule()
+
+    def prune(self):
+        """
+        Remove the longest unchanged inactive rows while there are too many.
+        """
+        excess = len(self.rows) - self.max_rows
+        if excess <= 0:
+            return
+        inactive = sorted([row for row in self.rows if not row.active],
+                          key=lambda row: row.last_change)
+        self.remove_rows(inactive[:excess])
+
+    def schedule(self):
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        """
+        Tell views about everything that has changed since the last flush.
+        """
+        if self.needs_sort:
+            self.emit(QtCore.SIGNAL("layoutAboutToBeChanged()"))
+            old_rows = list(self.rows)
+            if self.sort_key == 'freq':
+                self.rows.sort(key=lambda row: row.freq)
+            else:
+                self.rows.sort(key=lambda row: -row.last_change)
+            # Move persistent indexes (selection, current item) with their
+            # rows.
+            position_of_row = dict((row, i) for i, row in enumerate(self.rows))
+            old_indexes = self.persistentIndexList()
+            new_indexes = [
+                self.index(position_of_row[old_rows[index.row()]],
+                           index.column())
+                for index in old_indexes]
+            self.changePersistentIndexList(old_indexes, new_indexes)
+            self.emit(QtCore.SIGNAL("layoutChanged()"))
+            self.needs_sort = False
+            # The whole view is repainted after a layout change.
+            self.dirty.clear()
+        if self.dirty:
+            position_of_row = dict((row, i) for i, row in enumerate(self.rows))
+            positions = [position_of_row[row] for row in self.dirty]
+            self.dataChanged.emit(self.index(min(positions)),
+                                  self.index(max(positions)))
+            self.dirty.clear()
+
+
+class SignalDelegate(QtGui.QStyledItemDelegate):
+    """
+    Paints a row as the frequency followed by as much of the end of the
+    text as fits.
+    """
+
+    freq_width = 70
+
+    def paint(self, painter, option, index):
+        painter.save()
+        if option.state & QtGui.QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        foreground = index.data(QtCore.Qt.ForegroundRole)
+        if isinstance(foreground, QtCore.QVariant):
+            foreground = foreground.toPyObject()
+        if foreground is not None:
+            painter.setPen(foreground.color())
+        freq = index.data(FreqRole)
+        text = index.data(TextRole)
+        if isinstance(freq, QtCore.QVariant):
+            freq = freq.toPyObject()
+            text = text.toPyObject()
+        rect = option.rect.adjusted(4, 0, -4, 0)
+        freq_rect = QtCore.QRect(rect.left(), rect.top(), self.freq_width,
+                                 rect.height())
+        text_rect = rect.adjusted(self.freq_width, 0, 0, 0)
+        painter.drawText(freq_rect, QtCore.Qt.AlignVCenter,
+                         "{0:.1f}".format(freq))
+        elided = option.fontMetrics.elidedText(
+            text, QtCore.Qt.ElideLeft, text_rect.width())
+        painter.drawText(text_rect, QtCore.Qt.AlignVCenter, elided)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return QtCore.QSize(200, option.fontMetrics.height() + 4)
 
-    def update_message(self, text):
-        self.text_label.setText(text)
 
 class PSK31QWidget(QtGui.QWidget):
 
-    def __init__(self):
+    def __init__(self, sort_key='freq', max_rows=1000, repaint_interval=200):
         super(PSK31QWidget, self).__init__()
+        self.model = SignalListModel(sort_key, max_rows, repaint_interval,
+                                     self)
         self.initUI()
 
     def initUI(self):
         self.vbox = QtGui.QVBoxLayout()
         self.setLayout(self.vbox)
-        self.signal_widgets = {}
+        self.sort_box = QtGui.QComboBox(self)
+        self.sort_box.addItems(list(SORT_KEYS))
+        self.sort_box.setCurrentIndex(SORT_KEYS.index(self.model.sort_key))
+        self.sort_box.activated.connect(
+            lambda i: self.model.set_sort_key(SORT_KEYS[i]))
+        self.view = QtGui.QListView(self)
+        self.view.setUniformItemSizes(True)
+        self.view.setItemDelegate(SignalDelegate(self.view))
+        self.view.setModel(self.model)
+        self.vbox.addWidget(self.sort_box)
+        self.vbox.addWidget(self.view)
         self.show()
 
     def add_signal(self, signal):
-        sw = SignalWidget(signal.carrier_freq, signal.get_message())
-        self.signal_widgets[signal] = sw
-        self.vbox.addWidget(sw) 
+        self.model.add_signal(signal)
 
     def remove_stream(self, signal):
-        if signal in self.signal_widgets:
-            sw = self.signal_widgets[signal]
-            self.vbox.removeWidget(sw)         
+        self.model.remove_signal(signal)
 
     def update(self, signals):
-        for signal in signals:
-            sw = self.signal_widgets.get(signal, None)
-            if sw is None:
-                self.add_signal(signal)
-            else:
-                sw.update_message(signal.get_message())
+        self.model.update(signals)
+
+
+def waterfall_colours():
+    """
+    Returns a 256 entry colour table going from black through blue,
+    red and yellow to white.
+    """
+    stops = ((0, (0, 0, 0)), (64, (0, 0, 160)), (128, (200, 0, 0)),
+             (192, (255, 220, 0)), (255, (255, 255, 255)))
+    colours = []
+    for i in range(0, 256):
+        for (x0, c0), (x1, c1) in zip(stops[:-1], stops[1:]):
+            if x0 <= i <= x1:
+                f = 1.0*(i - x0)/(x1 - x0)
+                r, g, b = [int(a + f*(b - a)) for a, b in zip(c0, c1)]
+                colours.append(QtGui.qRgb(r, g, b))
+                break
+    return colours
+
+
+class WaterfallWidget(QtGui.QWidget):
+    """
+    A waterfall display of an fft calculated in the flow graph, such as
+    one from Detector.add_tap.
+
+    The rows are kept in a preallocated numpy ring of 8 bit colour
+    indices that a single indexed QImage is built on, so adding a row is
+    one numpy assignment and the colouring is done by the image's colour
+    table.  The image is drawn in two pieces starting at the newest row
+    rather than being scrolled.
+
+    The display is updated by its own timer, independent of the rate at
+    which the flow graph produces ffts.  If fetching and painting
+    take more than `cpu_budget` of the time the interval is lengthened,
+    and shortened again when they take well under it.
+
+    Args:
+        get_fft: Function returning the fft magnitudes as a numpy array
+            in fft order, e.g. FFTTap.get_fft_array.
+        fftwidth: Length of the fft.
+        n_rows: Number of rows of history.
+        interval: Initial time in ms between rows.
+        min_db, max_db: Power mapped to the ends of the colour table.
+        cpu_budget: Fraction of the GUI thread the waterfall may use.
+    """
+
+    min_interval = 20
+    max_interval = 2000
+
+    def __init__(self, get_fft, fftwidth, n_rows=300, interval=100,
+                 min_db=-20, max_db=60, cpu_budget=0.1):
+        super(WaterfallWidget, self).__init__()
+        self.get_fft = get_fft
+        self.fftwidth = fftwidth
+        self.n_rows = n_rows
+        self.min_db = min_db
+        self.max_db = max_db
+        self.cpu_budget = cpu_budget
+        # Width of QImage rows must be a multiple of 4 bytes.
+        self.stride = (fftwidth + 3)//4*4
+        self.pixels = numpy.zeros((n_rows, self.stride), dtype=numpy.uint8)
+        self.image = QtGui.QImage(self.pixels.data, fftwidth, n_rows,
+                                  self.stride, QtGui.QImage.Format_Indexed8)
+        self.image.setColorTable(waterfall_colours())
+        # Index of the newest row.
+        self.head = 0
+        self.power = numpy.empty(fftwidth, dtype=numpy.float32)
+        self.last_fft = None
+        self.center_freq = 0
+        self.samp_rate = 1
+        self.signal_freqs = []
+        self.busy_time = 0.0
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.tick)
+        self.setMinimumHeight(100)
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def set_band(self, center_freq, samp_rate):
+        self.center_freq = center_freq
+        self.samp_rate = samp_rate
+
+    def set_signals(self, signals):
+        """
+        Mark the frequencies of the active `signals`.
+        """
+        self.signal_freqs = [s.carrier_freq for s in signals if s.active]
+        self.update()
+
+    def add_row(self, fft):
+        """
+        Add a row for `fft` (magnitudes in fft order).
+        """
+        half = self.fftwidth//2
+        # Put the negative frequencies on the left.
+        self.power[:self.fftwidth-half] = fft[half:]
+        self.power[self.fftwidth-half:] = fft[:half]
+        numpy.maximum(self.power, 1e-12, out=self.power)
+        numpy.log10(self.power, self.power)
+        self.power *= 10*255.0/(self.max_db - self.min_db)
+        self.power -= self.min_db*255.0/(self.max_db - self.min_db)
+        numpy.clip(self.power, 0, 255, self.power)
+        self.head = (self.head - 1) % self.n_rows
+        self.pixels[self.head, :self.fftwidth] = self.power
+
+    def tick(self):
+        start = time.time()
+        fft = self.get_fft()
+        # The probe holds the last fft so only add a row when it changes.
+        if (len(fft) == self.fftwidth and
+            (self.last_fft is None or not numpy.array_equal(fft, self.last_fft))):
+            self.last_fft = fft
+            self.add_row(fft)
+            self.repaint()
+        busy = time.time() - start
+        # Smooth the time taken and adjust the interval to the budget.
+        self.busy_time = 0.9*self.busy_time + 0.1*busy
+        load = self.busy_time*1000/self.timer.interval()
+        interval = self.timer.interval()
+        if load > self.cpu_budget and interval < self.max_interval:
+            self.timer.setInterval(min(interval*2, self.max_interval))
+        elif load < self.cpu_budget/4 and interval > self.min_interval:
+            self.timer.setInterval(max(interval//2, self.min_interval))
+
+    def freq_to_x(self, freq):
+        offset = (freq - self.center_freq)/self.samp_rate + 0.5
+        return int(offset*self.width())
+
+    def pieces(self, height):
+        """
+        Returns how to draw the ring `height` pixels high as a list of
+        (y, h, first_row, n_rows) tuples, the newest rows first.
+        """
+        # From the head to the end of the ring and then from the start of
+        # the ring.
+        newer = self.n_rows - self.head
+        split = int(round(1.0*newer*height/self.n_rows))
+        pieces = [(0, split, self.head, newer)]
+        if self.head:
+            pieces.append((split, height - split, 0, self.head))
+        return pieces
 
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        width = self.width()
+        for y, h, first_row, n_rows in self.pieces(self.height()):
+            painter.drawImage(QtCore.QRect(0, y, width, h), self.image,
+                              QtCore.QRect(0, first_row, self.fftwidth,
+                                           n_rows))
+        painter.setPen(QtGui.QColor(0, 255, 0))
+        for freq in self.signal_freqs:
+            x = self.freq_to_x(freq)
+            painter.drawLine(x, 0, x, 10)
+            painter.drawText(x + 2, 20, "{0:.0f}".format(freq))
+        painter.end()
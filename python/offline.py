@@ -0,0 +1,321 @@
+"""
+A numpy implementation of the Linker and psk31_receiver path for decoding
+recordings offline.
+
+Rather than building a flow graph, whole blocks of samples are processed
+at once: each channel is mixed to baseband and decimated by a polyphase
+filter, the carrier offset estimated for the block is removed, and it is
+passed through a matched filter and then sampled at the symbol times
+estimated for that block.  The bits come from the phase difference
+between consecutive symbols and are varicode decoded.
+
+Many channels can be decoded from one recording in a single pass over a
+memory-mapped WAV file with decode_wav.
+"""
+
+import logging
+import math
+import re
+import struct
+
+import numpy
+
+import ham
+
+logger = logging.getLogger(__name__)
+
+def varicode_table():
+    """
+    Returns a dictionary mapping varicode bit strings to characters.
+
+    The codes come from the same table as psk31_decode_bb.
+    """
+    table = {}
+    for i in range(0, 128):
+        table[bin(ham.psk31_varicode(i))[2:]] = chr(i)
+    return table
+
+def low_pass(samp_rate, cutoff, transition):
+    """
+    Hamming windowed sinc low pass filter taps with unity gain at DC.
+    """
+    n = int(3.3*samp_rate/transition) | 1
+    t = numpy.arange(n) - (n - 1)/2.0
+    taps = numpy.sinc(2.0*cutoff/samp_rate*t)*numpy.hamming(n)
+    return taps/taps.sum()
+
+
+class PolyphaseDecimator(object):
+    """
+    Filters and decimates a stream handed over in blocks.
+
+    The taps are split into `decim` phases so that only the samples
+    that are kept are calculated.
+    """
+
+    def __init__(self, taps, decim):
+        self.decim = decim
+        n_phase = int(math.ceil(1.0*len(taps)/decim))
+        padded = numpy.zeros(n_phase*decim)
+        padded[:len(taps)] = taps
+        self.length = len(padded)
+        # phases[p][j] is taps[p + j*decim]
+        self.phases = padded.reshape(n_phase, decim).T.copy()
+        self.history = numpy.zeros(self.length - 1, dtype=numpy.complex64)
+
+    def process(self, samples):
+        buf = numpy.concatenate((self.history, samples))
+        n_out = (len(buf) - self.length)//self.decim + 1
+        if n_out <= 0:
+            self.history = buf
+            return numpy.zeros(0, dtype=numpy.complex64)
+        n_phase = self.phases.shape[1]
+        out = numpy.zeros(n_out, dtype=numpy.complex64)
+        for p in range(0, self.decim):
+            start = self.decim - 1 - p
+            stop = start + (n_out + n_phase - 1)*self.decim
+            out += numpy.convolve(buf[start:stop:self.decim], self.phases[p],
+                                  'valid')
+        self.history = buf[n_out*self.decim:]
+        return out
+
+
+class OfflineChannel(object):
+    """
+    Decodes the psk31 signal at one frequency from blocks of samples.
+
+    Args:
+        freq: Carrier frequency of the signal.
+        samp_rate: Sample rate of the recording.
+        bandwidth: Used to pick the decimation and filter as in Linker.
+        symbol_rate: psk31 symbol rate.
+        max_offset: The largest difference in Hz between `freq` and the
+            actual carrier that is corrected.
+    """
+
+    def __init__(self, freq, samp_rate, bandwidth=80, symbol_rate=31.25,
+                 max_offset=25, table=None):
+        self.freq = freq
+        self.max_offset = max_offset
+        self.samp_rate = samp_rate
+        self.decim = int(samp_rate/bandwidth/4)
+        self.channel_rate = 1.0*samp_rate/self.decim
+        self.sps = self.channel_rate/symbol_rate
+        self.decimator = PolyphaseDecimator(
+            low_pass(samp_rate, bandwidth, 40), self.decim)
+        # The psk31 pulse is a raised cosine two symbols long.
+        matched = numpy.hanning(int(round(2*self.sps)) + 1)
+        self.matched = PolyphaseDecimator(matched/matched.sum(), 1)
+        self.n = 0
+        # Estimated carrier frequency less freq and the phase reached in
+        # removing it.
+        self.offset = 0.0
+        self.offset_phase = 0.0
+        # Matched filter output not yet used for a symbol.
+        self.buf = numpy.zeros(0, dtype=numpy.complex64)
+        # Position in buf of the next symbol if the timing is unchanged.
+        self.next_t = None
+        self.last_symbol = None
+        self.bits = ''
+        self.text = []
+        if table is None:
+            table = varicode_table()
+        self.table = table
+
+    def mix(self, samples):
+        """
+        Shift the signal to zero frequency.
+        """
+        n = numpy.arange(self.n, self.n + len(samples), dtype=numpy.float64)
+        self.n += len(samples)
+        phase = numpy.mod(-2*math.pi*self.freq/self.samp_rate*n, 2*math.pi)
+        return samples*numpy.exp(1j*phase).astype(numpy.complex64)
+
+    def estimate_offset(self, baseband):
+        """
+        Estimate the carrier offset from the line at twice the offset in
+        the spectrum of the squared baseband.  Squaring removes the
+        phase reversals.  Returns the last estimate if the block is too
+        short to resolve the offset.
+        """
+        n = len(baseband)
+        if n < 32*self.sps:
+            return self.offset
+        n_fft = 1 << int(math.ceil(math.log(4*n, 2)))
+        spectrum = numpy.abs(numpy.fft.fft(baseband*baseband, n_fft))
+        # Only look within twice max_offset of zero.
+        k_max = int(2*self.max_offset*n_fft/self.channel_rate)
+        ks = numpy.arange(-k_max, k_max + 1)
+        powers = spectrum[ks]
+        i = int(numpy.argmax(powers))
+        k = float(ks[i])
+        # Interpolate between bins with a parabola through the peak.
+        if 0 < i < len(ks) - 1:
+            a, b, c = powers[i-1], powers[i], powers[i+1]
+            if a - 2*b + c != 0:
+                k += 0.5*(a - c)/(a - 2*b + c)
+        return k*self.channel_rate/n_fft/2
+
+    def remove_offset(self, baseband):
+        """
+        Shift `baseband` down by the estimated offset, keeping the phase
+        continuous from block to block.
+        """
+        step = -2*math.pi*self.offset/self.channel_rate
+        phase = self.offset_phase + step*numpy.arange(len(baseband))
+        self.offset_phase = ((self.offset_phase + step*len(baseband)) %
+                             (2*math.pi))
+        return baseband*numpy.exp(1j*phase).astype(numpy.complex64)
+
+    def symbols(self, samples):
+        """
+        Estimate the symbol timing over `samples` appended to the
+        leftover samples and return the interpolated symbols.
+        """
+        buf = numpy.concatenate((self.buf, samples))
+        sps = self.sps
+        if len(buf) < 2*sps:
+            self.buf = buf
+            return numpy.zeros(0, dtype=numpy.complex64)
+        # The envelope dips between symbols so its component at the
+        # symbol rate peaks at the symbol centres.
+        envelope = buf.real*buf.real + buf.imag*buf.imag
+        n = numpy.arange(len(buf))
+        line = numpy.sum(envelope*numpy.exp(-2j*math.pi*n/sps))
+        tau = (-numpy.angle(line)*sps/(2*math.pi)) % sps
+        # Carry on from the previous block's timing.
+        first = tau
+        if self.next_t is not None:
+            first += math.ceil((self.next_t - sps/2 - tau)/sps)*sps
+        times = numpy.arange(first, len(buf) - 1, sps)
+        if len(times) == 0:
+            self.buf = buf
+            return numpy.zeros(0, dtype=numpy.complex64)
+        index = times.astype(int)
+        frac = (times - index).astype(numpy.float32)
+        symbols = buf[index]*(1 - frac) + buf[index + 1]*frac
+        # Keep the samples from the last symbol onwards.
+        keep = index[-1]
+        self.next_t = times[-1] + sps - keep
+        self.buf = buf[keep:]
+        return symbols
+
+    def bits_from_symbols(self, symbols):
+        """
+        Returns '1' for no phase change and '0' for a reversal.
+        """
+        if self.last_symbol is not None:
+            symbols = numpy.concatenate(([self.last_symbol], symbols))
+        if len(symbols) < 2:
+            if len(symbols):
+                self.last_symbol = symbols[-1]
+            return ''
+        self.last_symbol = symbols[-1]
+        diff = symbols[1:]*numpy.conj(symbols[:-1])
+        # Remove the rotation left by what remains of the frequency
+        # error after remove_offset.  Squaring removes the data.
+        rotation = numpy.angle(numpy.sum(diff*diff))/2
+        diff *= numpy.exp(-1j*rotation)
+        return ''.join(numpy.where(diff.real > 0, '1', '0'))
+
+    def decode_bits(self, bits):
+        """
+        Varicode decode `bits` (after any left from the last block).
+        """
+        bits = self.bits + bits
+        # Characters are separated by two or more zeros.  The bits after
+        # the last separator may be an unfinished character.
+        end = bits.rfind('00')
+        if end < 0:
+            self.bits = bits
+            return ''
+        self.bits = bits[end:]
+        chars = []
+        for code in re.split('00+', bits[:end]):
+            code = code.strip('0')
+            if code:
+                chars.append(self.table.get(code, '?'))
+        return ''.join(chars)
+
+    def process(self, samples):
+        """
+        Decode a block of samples.  Returns the new text.
+        """
+        baseband = self.decimator.process(self.mix(samples))
+        self.offset = self.estimate_offset(baseband)
+        baseband = self.remove_offset(baseband)
+        symbols = self.symbols(self.matched.process(baseband))
+        text = self.decode_bits(self.bits_from_symbols(symbols))
+        self.text.append(text)
+        return text
+
+    def get_message(self):
+        return ''.join(self.text)
+
+
+def read_wav(filename):
+    """
+    Memory map the samples of a PCM WAV file.
+
+    Returns (samples, samp_rate) where samples is an array with one
+    column per channel.
+    """
+    with open(filename, 'rb') as f:
+        riff, size, wave = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError("{0} is not a WAV file.".format(filename))
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError("{0} has no data chunk.".format(filename))
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack('<HHIIHH', f.read(16))
+                f.seek(chunk_size - 16 + (chunk_size & 1), 1)
+            elif chunk_id == b'data':
+                offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), 1)
+    if fmt is None:
+        raise ValueError("{0} has no fmt chunk.".format(filename))
+    audio_format, channels, samp_rate, byte_rate, align, bits = fmt
+    dtypes = {8: numpy.uint8, 16: numpy.dtype('<i2'), 32: numpy.dtype('<i4')}
+    if audio_format != 1 or bits not in dtypes:
+        raise ValueError("Only 8, 16 and 32 bit PCM WAV files are supported.")
+    n = chunk_size//align
+    samples = numpy.memmap(filename, dtype=dtypes[bits], mode='r',
+                           offset=offset, shape=(n, channels))
+    return samples, samp_rate
+
+def decode(samples, samp_rate, freqs, block_size=1 << 18, **kwargs):
+    """
+    Decode the psk31 signals at `freqs` from the real `samples`.
+
+    Returns a dictionary mapping each frequency to its text.  Other
+    keyword arguments are passed to OfflineChannel.
+    """
+    table = varicode_table()
+    channels = [OfflineChannel(freq, samp_rate, table=table, **kwargs)
+                for freq in freqs]
+    if samples.dtype == numpy.uint8:
+        offset, scale = 128, 1.0/128
+    elif samples.dtype.kind == 'i':
+        offset, scale = 0, 1.0/numpy.iinfo(samples.dtype).max
+    else:
+        offset, scale = 0, 1.0
+    for start in range(0, len(samples), block_size):
+        block = ((samples[start:start+block_size].astype(numpy.float32)
+                  - offset)*scale)
+        for channel in channels:
+            channel.process(block)
+    return dict((channel.freq, channel.get_message()) for channel in channels)
+
+def decode_wav(filename, freqs, **kwargs):
+    """
+    Decode the psk31 signals at `freqs` from the first channel of a WAV
+    file.
+    """
+    samples, samp_rate = read_wav(filename)
+    return decode(samples[:, 0], samp_rate, freqs, **kwargs)
@@ -0,0 +1,114 @@
+"""
+Functions for generating psk31 signals.
+
+These are mostly useful for producing test vectors for the receivers.
+"""
+
+import math
+
+import ham
+
+def varicode_bits(text, preamble=32, postamble=32):
+    """
+    Convert `text` to a list of psk31 bits.
+
+    Each character is sent as its varicode followed by '00'.  The text
+    is padded with `preamble` and `postamble` zeros (phase reversals)
+    so that the receiver has something to lock on to.
+    """
+    bits = [0]*preamble
+    for c in text:
+        code = ham.psk31_varicode(ord(c))
+        if code == 0:
+            raise ValueError("Character {0!r} has no varicode.".format(c))
+        code_bits = []
+        while code:
+            code_bits.append(code & 1)
+            code >>= 1
+        code_bits.reverse()
+        bits += code_bits + [0, 0]
+    bits += [0]*postamble
+    return bits
+
+def parity(x):
+    p = 0
+    while x:
+        p ^= x & 1
+        x >>= 1
+    return p
+
+def bpsk31_points(bits):
+    """
+    Returns the constellation point for each bit.
+
+    A zero is sent as a phase reversal and a one as no change.
+    """
+    points = []
+    last = 1
+    for bit in bits:
+        if not bit:
+            last = -last
+        points.append(complex(last, 0))
+    return points
+
+# Phase change for each pair of code bits (see qpsk31_viterbi_cb).
+QPSK31_SHIFTS = (complex(-1, 0), complex(0, 1), complex(0, -1), complex(1, 0))
+
+def qpsk31_points(bits, reverse=False):
+    """
+    Returns the constellation point for each bit after passing them
+    through the rate 1/2, K=5 convolutional code used by qpsk31.
+    """
+    points = []
+    register = 0
+    last = complex(1, 0)
+    for bit in bits:
+        register = ((register << 1) | bit) & 0x1f
+        code = (parity(register & 0x19) << 1) | parity(register & 0x17)
+        shift = QPSK31_SHIFTS[code]
+        if reverse:
+            shift = shift.conjugate()
+        last = last*shift
+        points.append(last)
+    return points
+
+def psk31_samples(points, samples_per_symbol, freq=0, phase=0, amplitude=1):
+    """
+    Modulate constellation `points` into a list of complex samples.
+
+    The change from one point to the next is shaped with a half cosine
+    as in normal psk31.
+
+    Args:
+        points: The constellation point of each symbol.
+        samples_per_symbol: Integer number of samples for each symbol.
+        freq: Carrier frequency as a fraction of the sample rate.
+        phase: Initial carrier phase.
+        amplitude: Amplitude of the signal.
+    """
+    samples = []
+    last = complex(1, 0)
+    n = 0
+    for point in points:
+        for i in range(0, samples_per_symbol):
+            w = 0.5 + 0.5*math.cos(math.pi*i/samples_per_symbol)
+            angle = phase + 2*math.pi*freq*n
+            samples.append(amplitude*(w*last + (1-w)*point) *
+                           complex(math.cos(angle), math.sin(angle)))
+            n += 1
+        last = point
+    return samples
+
+def bpsk31_samples(bits, samples_per_symbol, freq=0, phase=0, amplitude=1):
+    """
+    Modulate `bits` as bpsk31.  See psk31_samples for the arguments.
+    """
+    return psk31_samples(bpsk31_points(bits), samples_per_symbol, freq,
+                         phase, amplitude)
+
+def qpsk31_samples(bits, samples_per_symbol, freq=0, phase=0, amplitude=1):
+    """
+    Modulate `bits` as qpsk31.  See psk31_samples for the arguments.
+    """
+    return psk31_samples(qpsk31_points(bits), samples_per_symbol, freq,
+                         phase, amplitude)
@@ -0,0 +1,368 @@
+"""
+Defines a Publisher that serves decoded text, signal events and spectrum
+frames to any number of subscribers over a TCP or Unix socket.
+
+Every message is sent as a frame made of a fixed header
+    kind (1 byte), timestamp (8 byte double), body length (4 bytes)
+followed by the body.  All values are big-endian.  The bodies are
+
+    TEXT:       freq (double) then the new text.
+    APPEAR:     freq (double).
+    DISAPPEAR:  freq (double).
+    SPECTRUM:   center freq (double), bin width (double) then the bin
+                magnitudes as floats.  The bins are in order of
+                increasing frequency and the center frequency falls in
+                bin n//2 of the n bins.
+    GAP:        number of TEXT, APPEAR and DISAPPEAR frames (unsigned
+                int) that were dropped just before the next frame.
+
+The timestamp is the time the message was published so a subscriber can
+measure its own delivery latency.
+
+Each subscriber has a bounded queue.  If a subscriber falls behind then
+with the 'coalesce' policy text for a signal is merged into the text
+already waiting for that signal, unless an APPEAR or DISAPPEAR for the
+signal is waiting after it, and a new spectrum replaces the one waiting.
+With either policy the oldest waiting spectrum is dropped once the queue
+is full, or if there is none the oldest waiting frame, in which case a
+GAP frame is sent in its place.
+"""
+
+import errno
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+TEXT = 1
+APPEAR = 2
+DISAPPEAR = 3
+SPECTRUM = 4
+GAP = 5
+
+HEADER = struct.Struct('!BdI')
+FREQ = struct.Struct('!d')
+SPECTRUM_HEADER = struct.Struct('!dd')
+COUNT = struct.Struct('!I')
+
+POLICIES = ('drop', 'coalesce')
+
+
+def encode_body(kind, key, value):
+    """
+    Encode the body of a frame.
+
+    For TEXT, APPEAR and DISAPPEAR `key` is the frequency of the signal.
+    For SPECTRUM `key` is ignored and `value` is
+    (center_freq, bin_width, bins).  For GAP `key` is ignored and `value`
+    is the number of frames dropped.
+    """
+    if kind == TEXT:
+        return FREQ.pack(key) + value.encode('utf-8')
+    elif kind in (APPEAR, DISAPPEAR):
+        return FREQ.pack(key)
+    elif kind == SPECTRUM:
+        center_freq, bin_width, bins = value
+        return (SPECTRUM_HEADER.pack(center_freq, bin_width) +
+                struct.pack('!{0}f'.format(len(bins)), *bins))
+    elif kind == GAP:
+        return COUNT.pack(value)
+    else:
+        raise ValueError("Unrecognised frame kind {0}.".format(kind))
+
+def decode_body(kind, body):
+    """
+    Inverse of encode_body.  Returns a (key, value) tuple.
+    """
+    if kind == TEXT:
+        return FREQ.unpack(body[:FREQ.size])[0], body[FREQ.size:].decode('utf-8')
+    elif kind in (APPEAR, DISAPPEAR):
+        return FREQ.unpack(body)[0], None
+    elif kind == SPECTRUM:
+        center_freq, bin_width = SPECTRUM_HEADER.unpack(
+            body[:SPECTRUM_HEADER.size])
+        n = (len(body) - SPECTRUM_HEADER.size)//4
+        bins = struct.unpack('!{0}f'.format(n), body[SPECTRUM_HEADER.size:])
+        return None, (center_freq, bin_width, list(bins))
+    elif kind == GAP:
+        return None, COUNT.unpack(body)[0]
+    else:
+        raise ValueError("Unrecognised frame kind {0}.".format(kind))
+
+def recv_exactly(sock, n):
+    chunks = []
+    while n > 0:
+        chunk = sock.recv(n)
+        if not chunk:
+            raise EOFError("Connection closed.")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b''.join(chunks)
+
+def read_frame(sock):
+    """
+    Read one frame from `sock`.
+
+    Returns (kind, timestamp, key, value).
+    """
+    kind, timestamp, length = HEADER.unpack(recv_exactly(sock, HEADER.size))
+    key, value = decode_body(kind, recv_exactly(sock, length))
+    return kind, timestamp, key, value
+
+def fftshift(bins):
+    """
+    Reorder bins in fft order (zero frequency first) so that the negative
+    frequencies come first.
+    """
+    half = len(bins)//2
+    return list(bins[half:]) + list(bins[:half])
+
+def decimate_bins(bins, decimation):
+    """
+    Average each group of `decimation` bins.
+    """
+    return [sum(bins[i:i+decimation])/len(bins[i:i+decimation])
+            for i in range(0, len(bins), decimation)]
+
+
+class Subscriber(object):
+    """
+    A connected client, its queue of waiting frames and its counters.
+    """
+
+    def __init__(self, sock, max_queue, policy):
+        self.sock = sock
+        self.max_queue = max_queue
+        self.policy = policy
+        # Items are [kind, key, value, timestamp].
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        # Frames other than spectra dropped since the last frame was sent.
+        self.lost = 0
+        self.coalesced = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def put(self, kind, key, value, timestamp):
+        with self.condition:
+            if self.policy == 'coalesce' and kind in (TEXT, SPECTRUM):
+                # Only merge with the latest frame for this key so that text
+                # is never moved ahead of an APPEAR or DISAPPEAR.
+                for item in reversed(self.queue):
+                    if item[1] != key:
+                        continue
+                    if item[0] == kind:
+                        if kind == TEXT:
+                            item[2] += value
+                        else:
+                            item[2] = value
+                            item[3] = timestamp
+                        self.coalesced += 1
+                        return
+                    break
+            if len(self.queue) >= self.max_queue:
+                self.drop()
+            self.queue.append([kind, key, value, timestamp])
+            self.condition.notify()
+
+    def drop(self):
+        """
+        Drop the oldest spectrum, or the oldest frame if there is none.
+        """
+        for i, item in enumerate(self.queue):
+            if item[0] == SPECTRUM:
+                del self.queue[i]
+                break
+        else:
+            self.queue.popleft()
+            self.lost += 1
+        self.dropped += 1
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def run(self):
+        """
+        Send waiting frames until closed.
+        """
+        try:
+            while True:
+                with self.condition:
+                    while not self.queue and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        break
+                    kind, key, value, timestamp = self.queue.popleft()
+                    lost = self.lost
+                    self.lost = 0
+                if lost:
+                    body = encode_body(GAP, None, lost)
+                    self.sock.sendall(HEADER.pack(GAP, time.time(), len(body))
+                                      + body)
+                body = encode_body(kind, key, value)
+                self.sock.sendall(HEADER.pack(kind, timestamp, len(body)) + body)
+                latency = time.time() - timestamp
+                self.sent += 1
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+        except socket.error as e:
+            logger.debug("Subscriber disconnected: {0}".format(e))
+        finally:
+            self.closed = True
+            self.sock.close()
+
+    def stats(self):
+        """
+        Returns a dictionary of the delivery counters.
+        """
+        with self.condition:
+            if self.sent:
+                mean_latency = self.total_latency/self.sent
+            else:
+                mean_latency = None
+            return {'sent': self.sent, 'dropped': self.dropped,
+                    'coalesced': self.coalesced, 'queued': len(self.queue),
+                    'mean_latency': mean_latency,
+                    'max_latency': self.max_latency}
+
+
+class Publisher(object):
+    """
+    Accepts subscribers on a socket and sends every published message to
+    each of them.
+
+    Args:
+        address: A (host, port) tuple for TCP or a path for a Unix socket.
+        max_queue: Maximum number of frames waiting for each subscriber.
+        policy: 'drop' or 'coalesce'.
+        spectrum_decimation: Number of fft bins averaged into each bin of
+            a published spectrum.
+    """
+
+    def __init__(self, address=('127.0.0.1', 0), max_queue=256,
+                 policy='coalesce', spectrum_decimation=4):
+        if policy not in POLICIES:
+            raise ValueError("Unrecognised policy {0}.".format(policy))
+        self.max_queue = max_queue
+        self.policy = policy
+        self.spectrum_decimation = spectrum_decimation
+        if isinstance(address, tuple):
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        else:
+            if os.path.exists(address):
+                os.remove(address)
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(address)
+        self.sock.listen(5)
+        self.address = self.sock.getsockname()
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.running = False
+        # State used by update().
+        self.active_freqs = set([])
+        self.sent_lengths = {}
+
+    def start(self):
+        self.running = True
+        self.accept_thread = threading.Thread(target=self.accept_loop)
+        self.accept_thread.daemon = True
+        self.accept_thread.start()
+
+    def stop(self):
+        self.running = False
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.sock.close()
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.close()
+            self.subscribers = []
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+    def accept_loop(self):
+        while self.running:
+            try:
+                conn, addr = self.sock.accept()
+            except socket.error as e:
+                if self.running and e.errno != errno.EINTR:
+                    logger.error("Accept failed: {0}".format(e))
+                break
+            if conn.family == socket.AF_INET:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            subscriber = Subscriber(conn, self.max_queue, self.policy)
+            thread = threading.Thread(target=subscriber.run)
+            thread.daemon = True
+            with self.lock:
+                self.subscribers.append(subscriber)
+            thread.start()
+
+    def publish(self, kind, key, value):
+        timestamp = time.time()
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if not s.closed]
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.put(kind, key, value, timestamp)
+
+    def publish_text(self, freq, text):
+        self.publish(TEXT, freq, text)
+
+    def publish_appear(self, freq):
+        self.publish(APPEAR, freq, None)
+
+    def publish_disappear(self, freq):
+        self.publish(DISAPPEAR, freq, None)
+
+    def publish_spectrum(self, center_freq, samp_rate, fft):
+        """
+        Publish an fft (in the order Detector.get_fft returns it)
+        with the negative frequencies moved first and decimated by
+        spectrum_decimation.
+        """
+        bins = decimate_bins(fftshift(fft), self.spectrum_decimation)
+        bin_width = 1.0*samp_rate/len(fft)*self.spectrum_decimation
+        self.publish(SPECTRUM, None, (center_freq, bin_width, bins))
+
+    def update(self, signals, detector=None):
+        """
+        Publish whatever has changed in `signals` since the last call,
+        and the current spectrum from `detector` if one is given.
+        """
+        for signal in signals:
+            freq = signal.carrier_freq
+            if signal.active and freq not in self.active_freqs:
+                self.active_freqs.add(freq)
+                self.publish_appear(freq)
+            elif not signal.active and freq in self.active_freqs:
+                self.active_freqs.remove(freq)
+                self.publish_disappear(freq)
+            message = signal.get_message()
+            sent = self.sent_lengths.get(freq, 0)
+            if len(message) > sent:
+                self.publish_text(freq, message[sent:])
+                self.sent_lengths[freq] = len(message)
+        if detector is not None:
+            self.publish_spectrum(detector.system.center_freq,
+                                  detector.system.samp_rate,
+                                  detector.get_fft())
+
+    def stats(self):
+        """
+        Returns a list with the counters of each connected subscriber.
+        """
+        with self.lock:
+            return [s.stats() for s in self.subscribers]
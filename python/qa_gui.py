@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# 
+# Copyright 2012 Free Software Foundation.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import sys
+import time
+
+import numpy
+from gnuradio import gr_unittest
+from PyQt4 import QtCore, QtGui
+
+from ham.gui import SignalListModel, WaterfallWidget
+
+class FakeSignal(object):
+
+    def __init__(self, freq, active=False):
+        self.carrier_freq = freq
+        self.active = active
+        self.message = ''
+
+    def get_message(self):
+        return self.message
+
+class qa_gui (gr_unittest.TestCase):
+
+    def setUp (self):
+        self.app = QtGui.QApplication.instance()
+        if self.app is None:
+            self.app = QtGui.QApplication(sys.argv)
+
+    def test_001_max_rows (self):
+        model = SignalListModel(max_rows=5, repaint_interval=0)
+        signals = [FakeSignal(100.0*i) for i in range(0, 20)]
+        for i in range(0, 3):
+            model.update(signals)
+            self.assertEqual(model.rowCount(), 5)
+        # A pruned signal comes back once it is active again.
+        pruned = [s for s in signals if s not in model.row_of_signal]
+        pruned[0].active = True
+        model.update(signals)
+        self.assertTrue(pruned[0] in model.row_of_signal)
+        self.assertEqual(model.rowCount(), 5)
+
+    def test_002_sort_moves_persistent_indexes (self):
+        model = SignalListModel(max_rows=10, repaint_interval=0)
+        signals = [FakeSignal(freq, True) for freq in (300.0, 100.0, 200.0)]
+        model.update(signals)
+        index = QtCore.QPersistentModelIndex(model.index(0))
+        model.flush()
+        self.assertEqual(model.rows[index.row()].signal, signals[0])
+
+    def test_003_waterfall_rows (self):
+        # Powers of 0 dB and 60 dB map to 63 and 255 with the default
+        # -20 to 60 dB range.
+        fft = numpy.ones(6, dtype=numpy.float32)
+        fft[1] = 1e6
+        waterfall = WaterfallWidget(lambda: fft, 6, n_rows=4)
+        self.assertEqual(waterfall.pixels.shape, (4, 8))
+        waterfall.add_row(fft)
+        self.assertEqual(waterfall.head, 3)
+        # Bin 1 is moved right of the centre by the shift.
+        self.assertEqual(list(waterfall.pixels[3]),
+                         [63, 63, 63, 63, 255, 63, 0, 0])
+        self.assertEqual(waterfall.pieces(100), [(0, 25, 3, 1),
+                                                 (25, 75, 0, 3)])
+        for i in range(0, 3):
+            waterfall.add_row(fft*10**(i + 1))
+        self.assertEqual(waterfall.head, 0)
+        # The newest row (30 dB) is at the head and the ring is drawn in
+        # one piece.
+        self.assertEqual(waterfall.pixels[0, 0], 159)
+        self.assertEqual(waterfall.pieces(100), [(0, 100, 0, 4)])
+        waterfall.add_row(fft)
+        self.assertEqual(waterfall.head, 3)
+        self.assertEqual(waterfall.pixels[3, 0], 63)
+
+    def test_004_waterfall_tick (self):
+        ffts = [numpy.ones(8, dtype=numpy.float32)]
+        def get_fft ():
+            return ffts[0]
+        waterfall = WaterfallWidget(get_fft, 8, n_rows=4, interval=100)
+        waterfall.tick()
+        self.assertEqual(waterfall.head, 3)
+        # The same fft again doesn't add a row.
+        waterfall.tick()
+        self.assertEqual(waterfall.head, 3)
+        # A slow fetch lengthens the interval.
+        def slow_fft ():
+            time.sleep(0.2)
+            return ffts[0]*2
+        waterfall.get_fft = slow_fft
+        interval = waterfall.timer.interval()
+        waterfall.tick()
+        self.assertEqual(waterfall.head, 2)
+        self.assertEqual(waterfall.timer.interval(), 2*interval)
+        # Quick fetches bring it back down to the minimum.
+        waterfall.get_fft = get_fft
+        for i in range(0, 100):
+            waterfall.tick()
+        self.assertEqual(waterfall.timer.interval(),
+                         WaterfallWidget.min_interval)
+
+
+if __name__ == '__main__':
+    gr_unittest.main ()
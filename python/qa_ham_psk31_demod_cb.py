@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# 
+# Copyright 2012 Free Software Foundation.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+from gnuradio import gr, gr_unittest
+
+from ham.psk31_encode import varicode_bits, bpsk31_samples
+from ham.signal_psk31 import (psk31_receiver, psk31_fused_receiver,
+                              msgq_to_string)
+
+class qa_psk31_demod_cb (gr_unittest.TestCase):
+
+    def decode (self, receiver_class, samples, samp_rate):
+        tb = gr.top_block()
+        src = gr.vector_source_c(samples, False)
+        receiver = receiver_class(samp_rate)
+        tb.connect(src, receiver)
+        tb.run()
+        return msgq_to_string(receiver.msgq_out)
+
+    def test_001_matches_chain (self):
+        text = "CQ CQ de TEST test message 12345 pse k\n"
+        samp_rate = 500
+        samples = bpsk31_samples(varicode_bits(text), 16, freq=0.002,
+                                 phase=0.3)
+        chain = self.decode(psk31_receiver, samples, samp_rate)
+        fused = self.decode(psk31_fused_receiver, samples, samp_rate)
+        self.assertTrue(text in fused)
+        self.assertEqual(chain, fused)
+
+
+if __name__ == '__main__':
+    gr_unittest.main ()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# 
+# Copyright 2012 Free Software Foundation.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import cmath
+
+from gnuradio import gr, gr_unittest
+import ham_swig
+
+from ham.psk31_encode import varicode_bits, qpsk31_points, qpsk31_samples
+from ham.signal_psk31 import qpsk31_receiver, msgq_to_string
+
+class qa_qpsk31_viterbi_cb (gr_unittest.TestCase):
+
+    text = "CQ CQ de TEST qpsk31 test 12345 pse k\n"
+
+    def setUp (self):
+        self.tb = gr.top_block ()
+
+    def tearDown (self):
+        self.tb = None
+
+    def decode_points (self, points, reverse=False):
+        src = gr.vector_source_c(points, False)
+        viterbi = ham_swig.qpsk31_viterbi_cb(reverse)
+        decoder = ham_swig.psk31_decode_bb(False)
+        dst = gr.vector_sink_b()
+        self.tb.connect(src, viterbi, decoder, dst)
+        self.tb.run()
+        return ''.join(chr(x) for x in dst.data())
+
+    def test_001_clean (self):
+        points = qpsk31_points(varicode_bits(self.text))
+        points = [p*cmath.exp(0.7j) for p in points]
+        self.assertTrue(self.text in self.decode_points(points))
+
+    def test_002_reverse (self):
+        points = qpsk31_points(varicode_bits(self.text), reverse=True)
+        self.assertTrue(self.text in self.decode_points(points, True))
+
+    def test_003_corrects_errors (self):
+        points = qpsk31_points(varicode_bits(self.text))
+        # Rotate a symbol by 90 degrees every 40 symbols.
+        for i in range(50, len(points), 40):
+            points[i] = points[i]*1j
+        self.assertTrue(self.text in self.decode_points(points))
+
+    def test_004_receiver (self):
+        samp_rate = 500
+        samples = qpsk31_samples(varicode_bits(self.text), 16, freq=0.002,
+                                 phase=0.3)
+        src = gr.vector_source_c(samples, False)
+        receiver = qpsk31_receiver(samp_rate)
+        self.tb.connect(src, receiver)
+        self.tb.run()
+        self.assertTrue(self.text in msgq_to_string(receiver.msgq_out))
+
+
+if __name__ == '__main__':
+    gr_unittest.main ()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# 
+# Copyright 2012 Free Software Foundation.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import numpy
+
+from gnuradio import gr_unittest
+
+from ham.psk31_encode import varicode_bits, bpsk31_samples
+from ham.offline import OfflineChannel, PolyphaseDecimator, decode
+
+class qa_offline (gr_unittest.TestCase):
+
+    def test_001_polyphase (self):
+        # Filtering in blocks matches filtering all at once.
+        taps = numpy.arange(1, 11, dtype=numpy.float64)
+        samples = numpy.arange(100).astype(numpy.complex64)
+        decimator = PolyphaseDecimator(taps, 3)
+        out = numpy.concatenate([decimator.process(samples[i:i+7])
+                                 for i in range(0, 100, 7)])
+        expected = numpy.convolve(samples, taps)[:100:3]
+        self.assertFloatTuplesAlmostEqual(out.real, expected.real)
+
+    def test_002_varicode (self):
+        channel = OfflineChannel(1000, 44100)
+        bits = ''.join(str(b) for b in varicode_bits('CQ de', 0, 0))
+        text = channel.decode_bits(bits[:7]) + channel.decode_bits(bits[7:])
+        self.assertEqual(text, 'CQ de')
+
+    def test_003_decode (self):
+        samp_rate = 44100
+        texts = {1000.0: "CQ CQ de G4ABC pse k\n",
+                 1500.0: "QRZ? de W1AW 73 es gl\n"}
+        total = None
+        for freq, text in texts.items():
+            samples = bpsk31_samples(varicode_bits(text), 1411,
+                                     freq=(freq + 2)/samp_rate, phase=1)
+            samples = numpy.array(samples).real.astype(numpy.float32)
+            if total is None:
+                total = samples
+            else:
+                n = min(len(total), len(samples))
+                total = total[:n] + samples[:n]
+        decoded = decode(total, samp_rate, list(texts.keys()),
+                         block_size=1 << 16)
+        for freq, text in texts.items():
+            self.assertTrue(text in decoded[freq])
+
+    def test_004_offset (self):
+        # Signals about 10 Hz away from where they are looked for, more
+        # than the 7.8 Hz that turns a symbol by 90 degrees.
+        samp_rate = 44100
+        text = "CQ CQ de G4ABC pse k\n"
+        for offset in (-11, 10):
+            samples = bpsk31_samples(varicode_bits(text), 1411,
+                                     freq=(1000.0 + offset)/samp_rate,
+                                     phase=1)
+            samples = numpy.array(samples).real.astype(numpy.float32)
+            decoded = decode(samples, samp_rate, [1000.0],
+                             block_size=1 << 16)
+            self.assertTrue(text in decoded[1000.0])
+
+
+if __name__ == '__main__':
+    gr_unittest.main ()
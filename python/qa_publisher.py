@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# 
+# Copyright 2012 Free Software Foundation.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import socket
+import threading
+import time
+
+from gnuradio import gr_unittest
+
+from ham.publisher import (Publisher, Subscriber, read_frame,
+                           TEXT, APPEAR, DISAPPEAR, SPECTRUM, GAP)
+
+class qa_publisher (gr_unittest.TestCase):
+
+    def setUp (self):
+        self.publisher = Publisher(('127.0.0.1', 0), spectrum_decimation=2)
+        self.publisher.start()
+        self.client = socket.create_connection(self.publisher.address)
+        self.client.settimeout(5)
+        # Wait until the publisher has accepted the connection.
+        self.wait_for(lambda: self.publisher.stats())
+
+    def wait_for (self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition():
+            if time.time() > deadline:
+                self.fail("Timed out waiting for the publisher.")
+            time.sleep(0.01)
+
+    def tearDown (self):
+        self.client.close()
+        self.publisher.stop()
+
+    def test_001_end_to_end (self):
+        self.publisher.publish_appear(1000.0)
+        self.publisher.publish_text(1000.0, 'CQ CQ')
+        # In fft order, so the negative frequencies are the last two.
+        self.publisher.publish_spectrum(0, 100, [1, 3, 5, 7])
+        self.publisher.publish_disappear(1000.0)
+        kind, timestamp, key, value = read_frame(self.client)
+        self.assertEqual((kind, key), (APPEAR, 1000.0))
+        kind, timestamp, key, value = read_frame(self.client)
+        self.assertEqual((kind, key, value), (TEXT, 1000.0, 'CQ CQ'))
+        kind, timestamp, key, value = read_frame(self.client)
+        self.assertEqual(kind, SPECTRUM)
+        self.assertEqual(value, (0, 50, [6, 2]))
+        kind, timestamp, key, value = read_frame(self.client)
+        self.assertEqual((kind, key), (DISAPPEAR, 1000.0))
+        # The count is updated just after each frame is sent.
+        self.wait_for(lambda: self.publisher.stats()[0]['sent'] == 4)
+        stats = self.publisher.stats()[0]
+        self.assertTrue(stats['max_latency'] >= 0)
+
+    def test_002_coalesce (self):
+        subscriber = Subscriber(None, 2, 'coalesce')
+        subscriber.put(TEXT, 1000.0, 'CQ', 0)
+        subscriber.put(TEXT, 1000.0, ' CQ', 1)
+        subscriber.put(SPECTRUM, None, 'first', 2)
+        subscriber.put(SPECTRUM, None, 'second', 3)
+        self.assertEqual([item[2] for item in subscriber.queue],
+                         ['CQ CQ', 'second'])
+        self.assertEqual(subscriber.coalesced, 2)
+        # The spectrum is dropped rather than the text.
+        subscriber.put(APPEAR, 2000.0, None, 4)
+        self.assertEqual(subscriber.dropped, 1)
+        self.assertEqual(subscriber.lost, 0)
+        self.assertEqual([item[0] for item in subscriber.queue],
+                         [TEXT, APPEAR])
+
+    def test_003_coalesce_keeps_order (self):
+        subscriber = Subscriber(None, 10, 'coalesce')
+        subscriber.put(TEXT, 1000.0, 'CQ', 0)
+        subscriber.put(DISAPPEAR, 1000.0, None, 1)
+        subscriber.put(TEXT, 1000.0, ' CQ', 2)
+        subscriber.put(TEXT, 2000.0, 'DE', 3)
+        subscriber.put(TEXT, 1000.0, ' DE', 4)
+        self.assertEqual([(item[0], item[2]) for item in subscriber.queue],
+                         [(TEXT, 'CQ'), (DISAPPEAR, None), (TEXT, ' CQ DE'),
+                          (TEXT, 'DE')])
+        self.assertEqual(subscriber.coalesced, 1)
+
+    def test_004_drop (self):
+        subscriber = Subscriber(None, 2, 'drop')
+        for i in range(0, 5):
+            subscriber.put(TEXT, 1000.0, str(i), i)
+        self.assertEqual([item[2] for item in subscriber.queue], ['3', '4'])
+        self.assertEqual(subscriber.dropped, 3)
+        self.assertEqual(subscriber.lost, 3)
+
+    def test_005_gap (self):
+        a, b = socket.socketpair()
+        b.settimeout(5)
+        subscriber = Subscriber(a, 2, 'drop')
+        for i in range(0, 4):
+            subscriber.put(TEXT, 1000.0, str(i), i)
+        thread = threading.Thread(target=subscriber.run)
+        thread.start()
+        try:
+            kind, timestamp, key, value = read_frame(b)
+            self.assertEqual((kind, value), (GAP, 2))
+            kind, timestamp, key, value = read_frame(b)
+            self.assertEqual((kind, value), (TEXT, '2'))
+            kind, timestamp, key, value = read_frame(b)
+            self.assertEqual((kind, value), (TEXT, '3'))
+        finally:
+            subscriber.close()
+            thread.join()
+            b.close()
+
+
+if __name__ == '__main__':
+    gr_unittest.main ()
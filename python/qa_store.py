@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# 
+# Copyright 2012 Free Software Foundation.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import os
+import shutil
+import tempfile
+
+from gnuradio import gr_unittest
+
+from ham.store import TrafficStore
+
+class qa_store (gr_unittest.TestCase):
+
+    def setUp (self):
+        self.dir = tempfile.mkdtemp()
+        self.store = TrafficStore(os.path.join(self.dir, 'traffic.db'))
+        self.store.start()
+
+    def tearDown (self):
+        shutil.rmtree(self.dir)
+
+    def test_001_queries (self):
+        self.store.add(1000.0, 'CQ CQ de G4', timestamp=10)
+        self.store.add(1000.0, 'ABC/P pse k', timestamp=11)
+        self.store.add(1500.0, 'W1AW de EA3XYZ 100%', timestamp=20)
+        self.store.stop()
+        rows = self.store.time_range(0, 15)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0][3], 'CQ CQ de G4ABC/P pse k')
+        self.assertEqual(len(self.store.freq_window(1400, 1600)), 1)
+        self.assertEqual(len(self.store.freq_window(1400, 1600, end=15)), 0)
+        self.assertEqual(len(self.store.search('100%')), 1)
+        self.assertEqual(len(self.store.search('10_')), 0)
+        self.assertEqual(self.store.search_callsign('g4abc')[0][1], 1000.0)
+        self.assertEqual(len(self.store.search_callsign('EA3XYZ')), 1)
+        self.assertEqual(len(self.store.search_callsign('W1AW')), 1)
+
+    def test_002_across_batches (self):
+        self.store.add(1000.0, 'de W1', timestamp=1)
+        self.store.stop()
+        self.store.start()
+        self.store.add(1000.0, 'AW k', timestamp=2)
+        self.store.stop()
+        rows = self.store.time_range(0, 3)
+        self.assertEqual([(row[0], row[3]) for row in rows],
+                         [(1, 'de W1AW k')])
+        rows = self.store.search_callsign('W1AW')
+        self.assertEqual([row[0] for row in rows], [1])
+
+    def test_003_across_rows (self):
+        self.store.stop()
+        store = TrafficStore(os.path.join(self.dir, 'rows.db'),
+                             max_row_length=10, max_idle=5)
+        store.start()
+        store.add(1000.0, 'CQ CQ de W', timestamp=1)
+        store.stop()
+        store.start()
+        store.add(1000.0, 'B1XYZ k', timestamp=2)
+        # Quiet for too long so a new row is started.
+        store.add(1000.0, ' 73', timestamp=20)
+        store.stop()
+        rows = store.time_range(0, 30)
+        self.assertEqual([row[3] for row in rows],
+                         ['CQ CQ de W', 'B1XYZ k', ' 73'])
+        self.assertEqual([row[0] for row in store.search('de wb1xyz')], [2])
+        self.assertEqual([row[0] for row in store.search('k 73')], [20])
+        self.assertEqual([row[0] for row in store.search('CQ')], [1])
+        self.assertEqual([row[0] for row in store.search_callsign('WB1XYZ')],
+                         [2])
+
+
+if __name__ == '__main__':
+    gr_unittest.main ()
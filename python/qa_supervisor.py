@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# 
+# Copyright 2012 Free Software Foundation.
+# 
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+# 
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+# 
+
+import os
+import time
+
+from gnuradio import gr_unittest
+
+from ham.supervisor import SourceSpec, Supervisor
+
+WAV = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                   '..', 'apps', 'example.WAV')
+
+class qa_supervisor (gr_unittest.TestCase):
+
+    def setUp (self):
+        specs = [SourceSpec('a', WAV, 44100), SourceSpec('b', WAV, 44100)]
+        self.supervisor = Supervisor(specs, cores=[0], scan_period=0.5)
+        self.supervisor.start()
+
+    def tearDown (self):
+        self.supervisor.stop()
+
+    def test_001_merged (self):
+        time.sleep(4)
+        self.supervisor.poll()
+        names = set(s[0] for s in self.supervisor.merged_signals())
+        self.assertEqual(names, set(['a', 'b']))
+        for margin in self.supervisor.margins().values():
+            self.assertTrue(margin is not None)
+        for headroom in self.supervisor.cpu_headrooms().values():
+            self.assertTrue(0 <= headroom <= 1)
+
+    def test_002_restart (self):
+        worker = self.supervisor.workers['a']
+        worker.process.terminate()
+        worker.process.join()
+        self.supervisor.poll()
+        self.assertEqual(worker.restarts, 1)
+        self.assertTrue(worker.process.is_alive())
+        # Results from the restarted worker arrive on its new pipe and the
+        # other worker is unaffected.
+        for other in self.supervisor.workers.values():
+            other.margin = None
+        time.sleep(4)
+        self.supervisor.poll()
+        for margin in self.supervisor.margins().values():
+            self.assertTrue(margin is not None)
+
+
+if __name__ == '__main__':
+    gr_unittest.main ()
@@ -43,6 +43,55 @@ class psk31_receiver(gr.hier_block2):
 
     def set_sample_rate(self, samp_rate):
         self.clock_recovery.set_omega(1.0*samp_rate/self.symbol_rate)
+
+
+class psk31_fused_receiver(gr.hier_block2):
+    """
+    Same as psk31_receiver but does all the demodulation and decoding
+    in the single ham.psk31_demod_cb block.
+    """
+
+    def __init__(self, samp_rate, symbol_rate=31.25):
+        super(psk31_fused_receiver, self).__init__(
+            "psk31_fused_receiver",
+            gr.io_signature(1, 1, gr.sizeof_gr_complex),
+            gr.io_signature(0, 0, 1))
+        self.symbol_rate = symbol_rate
+        self.demod = ham.psk31_demod_cb(
+            1.0*samp_rate/symbol_rate, 2*3.14/100, 0.25 * 0.1*0.1, 0.05, 0.1,
+            0.001, 2*3.14/100, -0.25, 0.25, True)
+        self.msgq_out = gr.msg_queue()
+        self.snk = gr.message_sink(gr.sizeof_char, self.msgq_out, True)
+        self.connect(self, self.demod, self.snk)
+
+    def set_sample_rate(self, samp_rate):
+        self.demod.set_omega(1.0*samp_rate/self.symbol_rate)
+
+
+class qpsk31_receiver(gr.hier_block2):
+    """
+    Receives qpsk31.  The symbols are found in the same way as in
+    psk31_receiver and then Viterbi decoded to the varicode bits.
+    """
+
+    def __init__(self, samp_rate, symbol_rate=31.25, reverse=False):
+        super(qpsk31_receiver, self).__init__(
+            "qpsk31_receiver",
+            gr.io_signature(1, 1, gr.sizeof_gr_complex),
+            gr.io_signature(0, 0, 1))
+        self.symbol_rate = symbol_rate
+        self.costas = digital.costas_loop_cc(2*3.14/100, 4)
+        self.clock_recovery = digital.clock_recovery_mm_cc(
+            1.0*samp_rate/symbol_rate, 0.25 * 0.1*0.1, 0.05, 0.1, 0.001)
+        self.viterbi = ham.qpsk31_viterbi_cb(reverse)
+        self.decoder = ham.psk31_decode_bb(False)
+        self.msgq_out = gr.msg_queue()
+        self.snk = gr.message_sink(gr.sizeof_char, self.msgq_out, True)
+        self.connect(self, self.costas, self.clock_recovery,
+                     self.viterbi, self.decoder, self.snk)
+
+    def set_sample_rate(self, samp_rate):
+        self.clock_recovery.set_omega(1.0*samp_rate/self.symbol_rate)
     
 
 def msgq_to_string(q):
@@ -71,12 +120,19 @@ class PSK31Signal(Signal):
     Represents the section of a flow graph that receives a psk31 signal.
     """
 
-    def __init__(self, samp_rate, freq):
+    def __init__(self, samp_rate, freq, fused=False, qpsk=False):
         super(PSK31Signal, self).__init__()
         self.message = ''
         self.carrier_freq = freq
         self.bandwidth = 80
-        self.receiver = psk31_receiver(samp_rate)
+        if qpsk:
+            if fused:
+                raise ValueError("There is no fused qpsk31 receiver.")
+            self.receiver = qpsk31_receiver(samp_rate)
+        elif fused:
+            self.receiver = psk31_fused_receiver(samp_rate)
+        else:
+            self.receiver = psk31_receiver(samp_rate)
         self.samp_rate = samp_rate
 
     def set_sample_rate(self, samp_rate):
@@ -0,0 +1,307 @@
+"""
+Defines a TrafficStore that keeps decoded text on disk in an SQLite
+database so that it can be searched by time, frequency and callsign.
+
+Text is added as it is decoded and written by a background thread in
+batches, one transaction per batch.  Text from a signal is appended to
+that signal's latest row, even across batches, until the row reaches a
+maximum length or the signal has been quiet for a while.  Each row also
+keeps the end of the text before it so that a search can find text that
+runs from one row into the next.  Callsigns are picked out of the text
+as it is written and kept in their own indexed table.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+import Queue
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS traffic (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    freq REAL NOT NULL,
+    source TEXT NOT NULL,
+    context TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS traffic_time ON traffic (time);
+CREATE INDEX IF NOT EXISTS traffic_freq_time ON traffic (freq, time);
+CREATE TABLE IF NOT EXISTS callsigns (
+    callsign TEXT NOT NULL,
+    traffic_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS callsigns_callsign ON callsigns (callsign);
+"""
+
+CALLSIGN_RE = re.compile(r'^(?:[A-Z]{1,2}|[0-9][A-Z]|[A-Z][0-9])[0-9][A-Z]{1,4}$')
+WORD_RE = re.compile(r'[A-Za-z0-9/]+')
+
+def find_callsigns(words):
+    """
+    Returns the callsigns among `words`.
+
+    Portable designators such as the /P in G4ABC/P are ignored.
+    """
+    callsigns = []
+    for word in words:
+        for part in word.upper().split('/'):
+            if CALLSIGN_RE.match(part):
+                callsigns.append(part)
+    return callsigns
+
+
+class OpenRow(object):
+    """
+    The row that a signal's text is currently being appended to.
+    """
+
+    def __init__(self, timestamp, context):
+        self.traffic_id = None
+        self.time = timestamp
+        self.last_time = timestamp
+        self.length = 0
+        # The end of the text before this row.
+        self.context = context
+        # The end of the text up to and including this row.
+        self.tail = context
+        # Text not yet written.
+        self.pending = ''
+
+
+class TrafficStore(object):
+    """
+    Persistent store of decoded text.
+
+    Args:
+        filename: The SQLite database file.
+        flush_interval: The longest time in seconds text waits before it
+            is written.
+        max_batch: The most pieces of text written in one transaction.
+        max_row_length: Text from one signal is appended to the same row
+            up to this many characters.
+        max_idle: A new row is started for a signal that has been quiet
+            for longer than this many seconds.
+        search_overlap: How many characters from the end of the previous
+            row are kept with each row.  Substrings up to one longer
+            than this are found even if they span two rows.
+    """
+
+    def __init__(self, filename, flush_interval=1.0, max_batch=10000,
+                 max_row_length=256, max_idle=30.0, search_overlap=64):
+        self.filename = filename
+        self.max_row_length = max_row_length
+        self.max_idle = max_idle
+        self.search_overlap = search_overlap
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.queue = Queue.Queue()
+        self.local = threading.local()
+        self.writer = None
+        self.written_rows = 0
+        self.written_chars = 0
+        # Unfinished word at the end of each signal's text.
+        self.partial_words = {}
+        # The OpenRow of each signal.
+        self.open_rows = {}
+        # State used by update().
+        self.sent_lengths = {}
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        """
+        Returns an SQLite connection for the calling thread.
+        """
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.filename)
+            # Readers don't wait for the writer, or the writer for them.
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def start(self):
+        self.writer = threading.Thread(target=self.write_loop)
+        self.writer.daemon = True
+        self.writer.start()
+
+    def stop(self):
+        """
+        Write everything that has been added and stop the writer.
+        """
+        self.queue.put(None)
+        self.writer.join()
+        self.writer = None
+
+    def add(self, freq, text, source='', timestamp=None):
+        """
+        Add text decoded from the signal at `freq`.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        self.queue.put((timestamp, freq, source, text))
+
+    def update(self, signals, source=''):
+        """
+        Add any text decoded from `signals` since the last call.
+        """
+        for signal in signals:
+            key = (source, signal.carrier_freq)
+            message = signal.get_message()
+            sent = self.sent_lengths.get(key, 0)
+            if len(message) > sent:
+                self.add(signal.carrier_freq, message[sent:], source)
+                self.sent_lengths[key] = len(message)
+
+    def write_loop(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except Queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self.write_batch(batch)
+        self.connection().close()
+        self.local.conn = None
+
+    def write_batch(self, batch):
+        """
+        Write a list of (time, freq, source, text) in one transaction.
+        """
+        conn = self.connection()
+        with conn:
+            touched = []
+            for timestamp, freq, source, text in batch:
+                key = (source, freq)
+                row = self.open_rows.get(key, None)
+                if (row is None or
+                    row.length + len(text) > self.max_row_length or
+                    timestamp - row.last_time > self.max_idle):
+                    if row is not None:
+                        self.write_row(conn, key, row)
+                        context = row.tail
+                    else:
+                        context = ''
+                    row = OpenRow(timestamp, context)
+                    self.open_rows[key] = row
+                row.pending += text
+                row.length += len(text)
+                row.last_time = timestamp
+                touched.append(key)
+            for key in touched:
+                self.write_row(conn, key, self.open_rows[key])
+
+    def write_row(self, conn, key, row):
+        """
+        Write the pending text of `row` for the signal `key`.
+        """
+        text = row.pending
+        if not text:
+            return
+        if row.traffic_id is None:
+            cursor = conn.execute(
+                "INSERT INTO traffic (time, freq, source, context, text) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [row.time, key[1], key[0], row.context, text])
+            row.traffic_id = cursor.lastrowid
+            self.written_rows += 1
+        else:
+            conn.execute("UPDATE traffic SET text = text || ? WHERE id = ?",
+                         [text, row.traffic_id])
+        row.pending = ''
+        if self.search_overlap:
+            row.tail = (row.tail + text)[-self.search_overlap:]
+        words = WORD_RE.findall(self.partial_words.get(key, '') + text)
+        if words and (text[-1].isalnum() or text[-1] == '/'):
+            self.partial_words[key] = words.pop()
+        else:
+            self.partial_words[key] = ''
+        conn.executemany(
+            "INSERT INTO callsigns (callsign, traffic_id) VALUES (?, ?)",
+            [(c, row.traffic_id) for c in find_callsigns(words)])
+        self.written_chars += len(text)
+
+    def query(self, where, args, limit):
+        sql = "SELECT time, freq, source, text FROM traffic"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY time"
+        if limit is not None:
+            sql += " LIMIT {0:d}".format(limit)
+        return self.connection().execute(sql, args).fetchall()
+
+    def time_range(self, start, end, limit=None):
+        """
+        Returns (time, freq, source, text) for all text received between
+        `start` and `end`.
+        """
+        return self.query(["time >= ?", "time < ?"], [start, end], limit)
+
+    def freq_window(self, low, high, start=None, end=None, limit=None):
+        """
+        Returns the text from signals between `low` and `high` Hz,
+        optionally limited to a time range.
+        """
+        where = ["freq >= ?", "freq < ?"]
+        args = [low, high]
+        if start is not None:
+            where.append("time >= ?")
+            args.append(start)
+        if end is not None:
+            where.append("time < ?")
+            args.append(end)
+        return self.query(where, args, limit)
+
+    def search(self, substring, start=None, end=None, limit=None):
+        """
+        Returns the rows containing `substring` (ignoring case).
+
+        A match that runs from one row into the next is returned with the
+        later row, as long as `substring` is at most one character longer
+        than search_overlap.  This has to look at the text of every row
+        in the time range so give a range when the store is large.
+        """
+        pattern = (substring.replace('\\', '\\\\').replace('%', '\\%')
+                   .replace('_', '\\_'))
+        if len(substring) > 1:
+            # Only the characters of the context that a match ending in
+            # this row's text could use.
+            where = ["substr(context, ?) || text LIKE ? ESCAPE '\\'"]
+            args = [1 - len(substring), '%' + pattern + '%']
+        else:
+            where = ["text LIKE ? ESCAPE '\\'"]
+            args = ['%' + pattern + '%']
+        if start is not None:
+            where.append("time >= ?")
+            args.append(start)
+        if end is not None:
+            where.append("time < ?")
+            args.append(end)
+        return self.query(where, args, limit)
+
+    def search_callsign(self, callsign, limit=None):
+        """
+        Returns the rows in which `callsign` was heard.
+        """
+        sql = ("SELECT traffic.time, traffic.freq, traffic.source, "
+               "traffic.text FROM callsigns JOIN traffic "
+               "ON callsigns.traffic_id = traffic.id "
+               "WHERE callsigns.callsign = ? ORDER BY traffic.time")
+        if limit is not None:
+            sql += " LIMIT {0:d}".format(limit)
+        return self.connection().execute(sql, [callsign.upper()]).fetchall()
@@ -0,0 +1,331 @@
+"""
+Defines a Supervisor that runs a receiving pipeline for each of several
+sources in separate processes and merges their results.
+
+Each worker process builds its own top block, System, Detector and
+Channelizer for one source and sends the signals it finds, the text
+decoded from them and how far ahead of real time it is back to the
+supervisor.  Each worker has its own pipe, which is also used to tell it
+to stop.  Nothing is shared between the workers, so a worker that dies
+part way through sending or holding a lock can only break its own pipe,
+which is replaced when the worker is restarted.
+"""
+
+import logging
+import multiprocessing
+import os
+import select
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class SourceSpec(object):
+    """
+    Describes a source for a worker to receive from.
+
+    The spec is sent to the worker process which then creates the
+    blocks itself since blocks cannot be shared between processes.
+
+    Args:
+        name: A name for the source that is unique within a supervisor.
+        filename: A WAV file to read from.
+        samp_rate: The sample rate of the file.
+        repeat: Whether to repeat the file when it runs out.
+        throttle: Whether to throttle the source to real time.
+        analytic: Passed on to System.
+    """
+
+    def __init__(self, name, filename, samp_rate, repeat=True, throttle=True,
+                 analytic=True):
+        self.name = name
+        self.filename = filename
+        self.samp_rate = samp_rate
+        self.repeat = repeat
+        self.throttle = throttle
+        self.analytic = analytic
+
+    def make_system(self):
+        """
+        Create the top block, source and System for this spec.
+        """
+        from gnuradio import gr
+        from ham.system import System
+        tb = gr.top_block()
+        src = gr.wavfile_source(self.filename, self.repeat)
+        return System(tb, src, self.samp_rate, throttle=self.throttle,
+                      src_is_float=True, center_freq=0,
+                      analytic=self.analytic)
+
+
+def set_affinity(core):
+    """
+    Pin the current process to `core` if psutil is available.
+    """
+    if core is None:
+        return
+    if psutil is None:
+        logger.warning("psutil is not installed so workers are not pinned.")
+        return
+    psutil.Process(os.getpid()).cpu_affinity([core])
+
+def cpu_time():
+    """
+    CPU time used by this process and all its threads.
+    """
+    times = os.times()
+    return times[0] + times[1]
+
+def run_worker(spec, conn, core=None, scan_period=1.0):
+    """
+    Receive from the source described by `spec` until anything is sent
+    down `conn` or the supervisor's end is closed.
+
+    Sends tuples down `conn`, blocking if the supervisor has not read
+    earlier ones:
+        ('signals', name, [(freq, active), ...])
+        ('text', name, freq, new_text)
+        ('stats', name, margin, cpu_headroom)
+    margin is how many samples were processed over the last scan period
+    relative to the number arriving in real time, less one, so it is
+    negative when the worker is falling behind.  With a throttled source
+    it stays near zero while the worker keeps up.  cpu_headroom is the
+    fraction of one core left unused by the process, which is 0 when
+    GNU Radio's threads are spread over several cores.
+    """
+    from ham.detector import Detector
+    from ham.channelizer import Channelizer
+    set_affinity(core)
+    system = spec.make_system()
+    detector = Detector(system)
+    channelizer = Channelizer(system)
+    signals = []
+    sent_lengths = {}
+    system.start()
+    last_wall = time.time()
+    last_cpu = cpu_time()
+    last_items = 0
+    try:
+        while not conn.poll(scan_period):
+            signals = detector.scan(signals)
+            channelizer.update_signals(signals)
+            system.refresh()
+            conn.send(('signals', spec.name,
+                       [(s.carrier_freq, s.active) for s in signals]))
+            for signal in signals:
+                message = signal.get_message()
+                sent = sent_lengths.get(signal, 0)
+                if len(message) > sent:
+                    conn.send(('text', spec.name, signal.carrier_freq,
+                               message[sent:]))
+                    sent_lengths[signal] = len(message)
+            wall = time.time()
+            cpu = cpu_time()
+            items = detector.stream_to_vector.nitems_read(0)
+            expected = system.samp_rate*(wall - last_wall)
+            margin = (items - last_items)/expected - 1.0
+            cpu_headroom = 1.0 - (cpu - last_cpu)/(wall - last_wall)
+            cpu_headroom = min(max(cpu_headroom, 0.0), 1.0)
+            conn.send(('stats', spec.name, margin, cpu_headroom))
+            last_wall = wall
+            last_cpu = cpu
+            last_items = items
+    finally:
+        system.stop()
+        conn.close()
+
+
+class Worker(object):
+    """
+    Supervisor's record of one source and the process receiving it.
+    """
+
+    def __init__(self, spec, core):
+        self.spec = spec
+        self.core = core
+        self.process = None
+        # The supervisor's end of the pipe from the process.
+        self.conn = None
+        self.restarts = 0
+        self.margin = None
+        self.cpu_headroom = None
+        self.signals = {}
+        self.text = {}
+
+
+class Supervisor(object):
+    """
+    Runs a worker process for each source and merges their results.
+
+    Args:
+        specs: A list of SourceSpec.
+        cores: Cores to pin the workers to.  Workers are assigned cores
+            in turn.  If None they are not pinned.
+        max_restarts: How many times a worker that dies is restarted.
+    """
+
+    def __init__(self, specs, cores=None, max_restarts=5, scan_period=1.0):
+        names = [spec.name for spec in specs]
+        if len(set(names)) != len(names):
+            raise ValueError("Source names must be unique.")
+        self.stopping = False
+        self.max_restarts = max_restarts
+        self.scan_period = scan_period
+        self.workers = {}
+        for i, spec in enumerate(specs):
+            if cores:
+                core = cores[i % len(cores)]
+            else:
+                core = None
+            self.workers[spec.name] = Worker(spec, core)
+
+    def start_worker(self, worker):
+        if worker.conn is not None:
+            worker.conn.close()
+        worker.conn, child_conn = multiprocessing.Pipe()
+        worker.process = multiprocessing.Process(
+            target=run_worker,
+            args=(worker.spec, child_conn, worker.core, self.scan_period),
+            name="ham-worker-{0}".format(worker.spec.name))
+        worker.process.daemon = True
+        worker.process.start()
+        # Only the worker holds its end so the pipe reports end of file
+        # once the worker has gone.
+        child_conn.close()
+
+    def start(self):
+        self.stopping = False
+        for worker in self.workers.values():
+            self.start_worker(worker)
+
+    def stop(self, timeout=5):
+        self.stopping = True
+        for worker in self.workers.values():
+            if worker.conn is not None:
+                try:
+                    worker.conn.send('stop')
+                except IOError:
+                    pass
+        deadline = time.time() + timeout
+        for worker in self.workers.values():
+            if worker.process is None:
+                continue
+            # Keep reading so that a worker blocked sending to a full pipe
+            # can finish.
+            while worker.process.is_alive() and time.time() < deadline:
+                self.poll()
+                worker.process.join(0.1)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self.poll()
+
+    def check_workers(self):
+        """
+        Restart any workers that have died.
+        """
+        if self.stopping:
+            return
+        for worker in self.workers.values():
+            if worker.process is not None and not worker.process.is_alive():
+                if worker.restarts >= self.max_restarts:
+                    continue
+                worker.restarts += 1
+                logger.warning("Worker {0} died with exit code {1}. "
+                               "Restarting.".format(worker.spec.name,
+                                                    worker.process.exitcode))
+                self.start_worker(worker)
+
+    def poll(self):
+        """
+        Read everything the workers have sent so far and restart dead ones.
+        """
+        conns = dict((worker.conn, worker)
+                     for worker in self.workers.values()
+                     if worker.conn is not None)
+        while conns:
+            ready, _, _ = select.select(list(conns), [], [], 0)
+            if not ready:
+                break
+            for conn in ready:
+                worker = conns[conn]
+                try:
+                    item = conn.recv()
+                except Exception as e:
+                    # The worker has exited or died part way through a
+                    # message.  Nothing more can be read from this pipe.
+                    logger.debug("Pipe from worker {0} closed: {1}".format(
+                        worker.spec.name, e))
+                    conn.close()
+                    worker.conn = None
+                    del conns[conn]
+                    continue
+                self.handle(worker, item)
+        self.check_workers()
+
+    def handle(self, worker, item):
+        kind = item[0]
+        if kind == 'signals':
+            worker.signals = dict(item[2])
+        elif kind == 'text':
+            freq, text = item[2], item[3]
+            worker.text[freq] = worker.text.get(freq, '') + text
+        elif kind == 'stats':
+            worker.margin, worker.cpu_headroom = item[2], item[3]
+        else:
+            raise ValueError("Unrecognised result {0}.".format(kind))
+
+    def merged_signals(self):
+        """
+        Returns a list of (source name, freq, active, text) for every
+        signal from every source, sorted by source and frequency.
+        """
+        merged = []
+        for name, worker in self.workers.items():
+            freqs = set(worker.signals.keys()) | set(worker.text.keys())
+            for freq in freqs:
+                merged.append((name, freq, worker.signals.get(freq, False),
+                               worker.text.get(freq, '')))
+        merged.sort()
+        return merged
+
+    def margins(self):
+        """
+        Returns a dictionary of the latest real-time margin of each source.
+
+        See run_worker for what the margin means.
+        """
+        return dict((name, worker.margin)
+                    for name, worker in self.workers.items())
+
+    def cpu_headrooms(self):
+        """
+        Returns a dictionary of the latest CPU headroom of each source.
+        """
+        return dict((name, worker.cpu_headroom)
+                    for name, worker in self.workers.items())
+
+
+def main(filenames, samp_rate=44100, duration=30):
+    specs = [SourceSpec(str(i), filename, samp_rate)
+             for i, filename in enumerate(filenames)]
+    supervisor = Supervisor(specs, cores=range(multiprocessing.cpu_count()))
+    supervisor.start()
+    try:
+        for i in range(0, duration):
+            time.sleep(1)
+            supervisor.poll()
+            print("Margins: {0}".format(supervisor.margins()))
+            for name, freq, active, text in supervisor.merged_signals():
+                if active:
+                    print("{0} {1:.1f}: {2}".format(name, freq, text[-60:]))
+    finally:
+        supervisor.stop()
+
+if __name__ == '__main__':
+    import sys
+    main(sys.argv[1:])
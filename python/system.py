@@ -10,15 +10,38 @@ class System(object):
         samp_rate - The sample rate of the src block.
         throttle - Whether to apply a throttle.
         src_is_float - Whether src produces floats.
+        analytic - If src produces floats, convert them to an analytic
+            complex signal at half the sample rate rather than just using
+            them as the imaginary part of a complex stream.
+        min_freq - With analytic, the band from min_freq to
+            samp_rate/2 - min_freq is passed unattenuated and frequencies
+            below min_freq/2 are removed.  Smaller values need a longer
+            filter.
     """
 
     def __init__(self, tb, src, samp_rate, throttle=False, src_is_float=False,
-                 center_freq=0):
+                 center_freq=0, analytic=False, min_freq=200):
         self.center_freq = center_freq
         self.tb = tb
         self.src = src
         self.samp_rate = samp_rate
-        if src_is_float:
+        if src_is_float and analytic:
+            # Shift the band down by a quarter of the sample rate so that
+            # the positive frequencies are centered on zero and then
+            # filter out the negative frequencies while decimating by 2.
+            # The result contains the real signal just once at half the
+            # rate.  Zero frequency in the source ends up at the edge of
+            # the band so the transition has to fit in below min_freq.
+            taps = gr.firdes.low_pass(1, samp_rate,
+                                      samp_rate/4.0 - 0.75*min_freq,
+                                      0.5*min_freq)
+            self.to_analytic = gr.freq_xlating_fir_filter_fcf(
+                2, taps, samp_rate/4.0, samp_rate)
+            self.tb.connect(self.src, self.to_analytic)
+            self.out = self.to_analytic
+            self.center_freq = center_freq + samp_rate/4.0
+            self.samp_rate = samp_rate/2.0
+        elif src_is_float:
             self.null = gr.null_source(gr.sizeof_float)
             self.float_to_complex = gr.float_to_complex(1)
             self.tb.connect(self.null, (self.float_to_complex, 0))
@@ -27,7 +50,7 @@ class System(object):
         else:
             self.out = self.src
         if throttle:
-            self.throttle = gr.throttle(gr.sizeof_gr_complex, samp_rate)
+            self.throttle = gr.throttle(gr.sizeof_gr_complex, self.samp_rate)
             self.tb.connect(self.out, self.throttle)
             self.out = self.throttle
         null = gr.null_sink(gr.sizeof_gr_complex)
@@ -9,6 +9,9 @@
 
 %{
 #include "ham_psk31_decode_bb.h"
+#include "ham_psk31_demod_cb.h"
+#include "ham_psk31_varicode.h"
+#include "ham_qpsk31_viterbi_cb.h"
 %}
 
 #if SWIGGUILE
@@ -22,3 +25,13 @@
 #endif
 GR_SWIG_BLOCK_MAGIC(ham,psk31_decode_bb);
 %include "ham_psk31_decode_bb.h"
+
+GR_SWIG_BLOCK_MAGIC(ham,psk31_demod_cb);
+%include "ham_psk31_demod_cb.h"
+
+%rename(psk31_varicode) ham_psk31_varicode;
+%ignore ham_psk31_varicode_map;
+%include "ham_psk31_varicode.h"
+
+GR_SWIG_BLOCK_MAGIC(ham,qpsk31_viterbi_cb);
+%include "ham_qpsk31_viterbi_cb.h"